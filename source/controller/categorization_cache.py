@@ -0,0 +1,128 @@
+"""
+Class Name: CategorizationCache.py
+Blue+print of:persistent description -> sub_category cache keyed by mapper fingerprint
+"""
+# Dependencies
+import os
+import json
+import hashlib
+
+# Internal Dependencies
+from source.framework.library.a_integrator import LOG
+from source.framework.library.keyword_matcher import changed_keywords, compile_matcher
+
+# CONSTANTS
+CATEGORIZATION_CACHE_PATH = "database/cache/categorization_cache.json"
+CACHE_VERSION = 2  # bump when the entry format changes
+
+
+class CategorizationCache:
+    """
+    Purpose: Blueprint of the on-disk categorization cache
+             When the content hash of the mapper files changes, only the descriptions
+             that contain an edited keyword of the first (description) mapper are dropped.
+             Only the sub_category is cached, the category is looked up from it every run.
+    Attributes:
+        file_path : str
+        fingerprint : str "content hash of the mapper files"
+        mapper : dict "current description mapper, saved as the snapshot for the next run"
+        description_hits : int "distinct descriptions answered from the cache"
+        description_misses : int "distinct descriptions that had to be categorized"
+    Methods:
+        lookup : returns the cached entries of the given descriptions
+        remember : adds newly categorized descriptions
+        save : writes the cache back to the disk
+    """
+
+    def __init__(self, mapper_paths: tuple, file_path: str = CATEGORIZATION_CACHE_PATH):
+        """
+        Attributes:
+            mapper_paths : tuple "JSON mapper files the cached results depend on"
+            file_path : str
+        """
+        self.file_path: str = os.path.join(os.getcwd(), file_path)
+        self.fingerprint: str = self.fingerprint_of(mapper_paths)
+        with open(os.path.join(os.getcwd(), mapper_paths[0]), 'r', encoding='utf-8') as file:
+            self.mapper: dict = json.load(file)
+        self.description_hits: int = 0
+        self.description_misses: int = 0
+        self.__changed: bool = False
+        self.__entries: dict = self.load()
+
+    @staticmethod
+    def fingerprint_of(file_paths: tuple) -> str:
+        """returns a content hash over all the given files"""
+        digest = hashlib.sha256()
+        for file_path in file_paths:
+            with open(os.path.join(os.getcwd(), file_path), 'rb') as file:
+                digest.update(file.read())
+        return digest.hexdigest()
+
+    def load(self) -> dict:
+        """Load the entries, the ones an edited keyword could affect are dropped"""
+        if not os.path.exists(self.file_path):
+            LOG.debug(f"No categorization cache at {self.file_path = }")
+            return {}
+
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except (ValueError, OSError) as e:
+            LOG.error(f"Ignoring unreadable categorization cache {e = }")
+            return {}
+
+        if data.get("version") != CACHE_VERSION:
+            LOG.info("Outdated categorization cache ignored")
+            return {}
+
+        entries = data.get("entries", {})
+        if data.get("fingerprint") == self.fingerprint:
+            return entries
+
+        if "mapper" not in data:
+            LOG.info("Mapper changed, categorization cache invalidated")
+            return {}
+
+        changed = changed_keywords(data["mapper"], self.mapper)
+        if changed:
+            detector = compile_matcher({"changed": changed})
+            entries = {
+                description: entry for description, entry in entries.items()
+                if not detector.match(description)
+            }
+        self.__changed = True
+        LOG.info(f"Mapper changed, {len(changed)} keywords edited, "
+                 f"{len(entries)} cached descriptions kept")
+        return entries
+
+    def lookup(self, descriptions) -> dict:
+        """returns {description: sub_category} for the cached distinct descriptions"""
+        found = {}
+        for description in descriptions:
+            entry = self.__entries.get(description) if isinstance(description, str) else None
+            if entry is None:
+                self.description_misses += 1
+            else:
+                found[description] = entry
+        self.description_hits += len(found)
+        return found
+
+    def remember(self, descriptions, sub_categories) -> None:
+        """adds newly categorized descriptions into the cache and refreshes the others"""
+        for description, sub_category in zip(descriptions, sub_categories):
+            if isinstance(description, str) and self.__entries.get(description) != sub_category:
+                self.__entries[description] = sub_category
+                self.__changed = True
+
+    def save(self) -> None:
+        """Save the cache to a file, only when new entries were added"""
+        if not self.__changed:
+            return
+
+        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+        with open(self.file_path, 'w', encoding='utf-8') as file:
+            json.dump({"version": CACHE_VERSION, "fingerprint": self.fingerprint,
+                       "mapper": self.mapper, "entries": self.__entries}, file)
+
+        self.__changed = False
+        LOG.debug(f"categorization cache saved with {len(self.__entries)} entries")
@@ -0,0 +1,105 @@
+"""
+Class Name: CategorizationProfiler.py
+Blue+print of:hit counters and stage timings of the transaction categorization
+"""
+# Dependencies
+import os
+import json
+import time
+from contextlib import contextmanager
+import pandas as pd
+
+# Internal Dependencies
+from source.framework.library.a_integrator import LOG
+from source.framework.library.keyword_matcher import NO_MATCH
+
+
+class CategorizationProfiler:
+    """
+    Purpose: Blueprint of the categorization instrumentation
+    Attributes:
+        rows : int "transactions categorized"
+        misses : int "transactions that fell through to the default category"
+        category_hits : dict "category -> transactions"
+        keyword_hits : dict "(category, keyword) -> transactions, every mapper keyword is listed"
+        timings : dict "stage -> elapsed seconds"
+    Methods:
+        stage : context manager that times a stage
+        record : counts the hits of categorized descriptions
+        report : returns the keyword hits as a table
+        dump : writes the report as CSV or JSON
+    """
+
+    def __init__(self):
+        """
+        Attributes: all the counters start empty
+        """
+        self.rows: int = 0
+        self.misses: int = 0
+        self.category_hits: dict = {}
+        self.keyword_hits: dict = {}
+        self.timings: dict = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """times the wrapped block and adds it to the stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed
+            LOG.debug(f"{name} took {elapsed:.4f}s")
+
+    def record(self, descriptions: pd.Series, categories: pd.Series, hash_map: dict) -> None:
+        """
+        counts hits per category and per keyword
+        The keyword credited is the first one of the category found in the description,
+        the same keyword the naive scan stops at.
+        """
+        for category, keywords in hash_map.items():
+            for keyword in keywords:
+                self.keyword_hits.setdefault((category, keyword), 0)
+
+        counts = pd.DataFrame({'description': descriptions, 'category': categories}) \
+            .value_counts(dropna=False)
+
+        for (description, category), count in counts.items():
+            self.rows += count
+            if category == NO_MATCH:
+                self.misses += count
+                continue
+
+            self.category_hits[category] = self.category_hits.get(category, 0) + count
+            content = str(description).lower()
+            for keyword in hash_map.get(category, []):
+                if keyword.lower() in content:
+                    self.keyword_hits[(category, keyword)] += count
+                    break
+
+    def report(self) -> pd.DataFrame:
+        """returns the keyword hits, most used first and dead keywords last"""
+        report = pd.DataFrame(
+            [(category, keyword, hits) for (category, keyword), hits in self.keyword_hits.items()],
+            columns=['category', 'keyword', 'hits']
+        )
+        return report.sort_values('hits', ascending=False, kind='stable', ignore_index=True)
+
+    def dump(self, file_path: str) -> None:
+        """writes the report, CSV holds the keyword table and JSON holds every counter"""
+        file_path = os.path.join(os.getcwd(), file_path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
+        if file_path.lower().endswith(".csv"):
+            self.report().to_csv(file_path, index=False)
+        else:
+            with open(file_path, 'w', encoding='utf-8') as file:
+                json.dump({
+                    "rows": int(self.rows),
+                    "misses": int(self.misses),
+                    "timings": self.timings,
+                    "category_hits": {key: int(value) for key, value in self.category_hits.items()},
+                    "keyword_hits": self.report().to_dict(orient='records'),
+                }, file, indent=4, default=int)
+
+        LOG.info(f"categorization profile written to {file_path = }")
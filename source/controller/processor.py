@@ -3,48 +3,120 @@ Class Name: Processor.py
 Blue+print of:process the statement makes it available for the report
 """
 # Dependencies
+import json
+from contextlib import nullcontext
+import numpy as np
 import pandas as pd
 
 # Internal Dependencies
-from source.framework.library.a_integrator import LOG
+from source.controller.categorization_cache import CategorizationCache
+from source.controller.categorization_profiler import CategorizationProfiler
+from source.framework.library.a_integrator import LOG, CONFIG
 from source.framework.library.json_handler import JsonHandler
+from source.framework.library.keyword_matcher import (
+    changed_keywords, compile_matcher, invert_hash_map, MatcherPool,
+    DEFAULT_ENGINE, NO_MATCH
+)
 from source.framework.library.pandas_toolkit import PandasToolkit
 
 
 # CONSTANTS
 SUB_CATEGORY_HASH_MAP_PATH = "database/mapper/description_to_sub_category.json"
 CATEGORY_HASH_MAP_PATH = "database/mapper/sub_category_to_category.json"
+C_OR_D_CATEGORIES = ["earnings", "expenditures"]
+# DataFrame.attrs key of the description mapper the sub_category column was matched with
+MAPPER_SNAPSHOT_ATTR = "sub_category_mapper"
 
 class Processor:
     """
     Purpose: Blueprint that processes the statement makes it available for making report
     Attributes:
         __raw_transactions : pd.Dataframe
+        __cache : CategorizationCache | None
+        __pool : MatcherPool "workers and engine matching the descriptions, kept until close"
+        __options : dict "category_lookup, chunk_size and compact settings"
+        profiler : CategorizationProfiler | None "hit counters and stage timings"
     Methods:
         process_transactions : will add additional columns based on the existing data
+        process : processes another statement with the same settings, caches and workers
+        close : shuts the matching workers down
+        recategorize : re-categorizes only the rows affected by a mapper edit
+        compact_schema : stores the category columns as pandas category dtype
     """
 
     def __init__(self, **kwargs):
         """
         Attributes:
-            transactions : pd.Dataframe
+            raw_transactions : pd.Dataframe "None processes nothing until process is called"
+            engine : str "aho_corasick" (default), "regex" or "naive"
+            use_cache : bool "reuse categorizations of earlier runs" (default True)
+            category_lookup : str "exact" (default) or "substring"
+            workers : int (default from settings, 1 keeps it in the current process)
+            chunk_size : int (default from settings)
+            profile : bool "records hit counters and stage timings" (default False)
+            compact : bool "stores sub_category and category as category dtype" (default False)
         """
         self.__raw_transactions: pd.DataFrame = kwargs.get("raw_transactions")
+        self.__cache: CategorizationCache | None = CategorizationCache(
+            mapper_paths=(SUB_CATEGORY_HASH_MAP_PATH, CATEGORY_HASH_MAP_PATH)
+        ) if kwargs.get("use_cache", True) else None
+        self.__pool: MatcherPool = MatcherPool(int(kwargs.get(
+            "workers", CONFIG.get(section="processor_settings", option="workers", fallback=1)
+        )), engine=kwargs.get("engine", DEFAULT_ENGINE))
+        self.__options: dict = {
+            "category_lookup": kwargs.get("category_lookup", "exact"),
+            "chunk_size": int(kwargs.get(
+                "chunk_size",
+                CONFIG.get(section="processor_settings", option="chunk_size", fallback=50000)
+            )),
+            "compact": kwargs.get("compact", False),
+        }
+        self.profiler: CategorizationProfiler | None = \
+            CategorizationProfiler() if kwargs.get("profile", False) else None
+        self.processed_transactions = None
+        if self.__raw_transactions is not None:
+            # One statement, the workers are not kept
+            self.processed_transactions = self.process_transactions()
+            self.close()
+
+    def process(self, raw_transactions: pd.DataFrame) -> pd.DataFrame:
+        """
+        processes another statement, e.g. the chunks of a stream, the categorization cache
+        and the settings are loaded once for all of them
+        """
+        self.__raw_transactions = raw_transactions
         self.processed_transactions = self.process_transactions()
+        return self.processed_transactions
+
+    def close(self) -> None:
+        """shuts the matching workers down, a later process starts new ones"""
+        self.__pool.close()
 
     def process_transactions(self) -> pd.DataFrame:
         """
         To perform: will add additional columns based on the existing data
-        1. Adds subcategory column
+        1. Adds subcategory column, the mapper used is kept in attrs (see recategorize)
         2. Adds category column
         3. Adds C_or_D
+        4. Stores the new categorizations into the cache
+        5. Compact schema: low-cardinality columns as category dtype
         """
         LOG.info("starts processing the transactions")
 
+        with self._stage("sub_category"):
+            self._add_sub_category()
+
+        with self._stage("category"):
+            self._add_category()
 
-        self._add_category()
+        with self._stage("c_or_d"):
+            self._add_c_or_d()
 
-        self._add_c_or_d()
+        with self._stage("cache"):
+            self._update_cache()
+
+        if self.__options["compact"]:
+            self.__raw_transactions = self.compact_schema(self.__raw_transactions)
 
         LOG.info("Processed transactions available to generate report")
         return self.__raw_transactions
@@ -59,14 +131,22 @@ class Processor:
         # Reads the JSON file
         sub_category_mapper = JsonHandler(file_path=SUB_CATEGORY_HASH_MAP_PATH)
 
-
-        # Adds new column category to database.
-        self.__raw_transactions = PandasToolkit.add_column(
+        # Adds new column category to database, each distinct description is matched once
+        self.__raw_transactions = PandasToolkit.add_column_from_unique(
             df=self.__raw_transactions,
             column_name="sub_category",
             source_column='description',
-            func=lambda description: self.mapper(description,sub_category_mapper.data)
+            func=lambda descriptions: self._match_descriptions(
+                sub_category_mapper.data, descriptions
+            )
         )
+        # A JSON string, attrs are deep-copied by every pandas operation
+        self.__raw_transactions.attrs[MAPPER_SNAPSHOT_ATTR] = json.dumps(sub_category_mapper.data)
+
+        if self.profiler is not None:
+            self.profiler.record(self.__raw_transactions['description'],
+                                 self.__raw_transactions['sub_category'],
+                                 sub_category_mapper.data)
 
         LOG.info("sub_category added to transactions")
         return self.__raw_transactions
@@ -85,13 +165,25 @@ class Processor:
         # Reads the JSON file
         category_mapper = JsonHandler(file_path=CATEGORY_HASH_MAP_PATH)
 
-        # Adds new column category to database.
-        self.__raw_transactions = PandasToolkit.add_column(
-            df=self.__raw_transactions,
-            column_name="category",
-            source_column='sub_category',
-            func=lambda sub_category_column: self.mapper(sub_category_column,category_mapper.data)
-            )
+        if self.__options["category_lookup"] == "substring":
+            matcher = compile_matcher(category_mapper.data, engine=self.__pool.engine)
+
+            # Adds new column category to database.
+            self.__raw_transactions = PandasToolkit.add_column_from_unique(
+                df=self.__raw_transactions,
+                column_name="category",
+                source_column='sub_category',
+                func=matcher.match_many
+                )
+        else:
+            # sub_category is already an exact name, one dict lookup per row is enough
+            self.__raw_transactions = PandasToolkit.map_column(
+                df=self.__raw_transactions,
+                column_name="category",
+                source_column='sub_category',
+                mapping=invert_hash_map(category_mapper.data),
+                default=NO_MATCH
+                )
 
         LOG.info("category added to transactions")
         return self.__raw_transactions
@@ -106,13 +198,127 @@ class Processor:
             df=self.__raw_transactions,
             column_name="c_or_d",
             source_column='amount',
-            func=lambda amount_column: "earnings" if amount_column > 0 else "expenditures"
+            func=self.classify_c_or_d
             )
 
 
         LOG.info("c_or_d added to transactions")
         return self.__raw_transactions
 
+    def _match_descriptions(self, hash_map: dict, descriptions) -> list:
+        """returns the sub_category of each description, cached ones are not matched again"""
+        if self.__cache is None:
+            return self._match(hash_map, descriptions)
+
+        cached = self.__cache.lookup(descriptions)
+        missing = [description for description in descriptions if description not in cached]
+        matched = dict(zip(missing, self._match(hash_map, missing)))
+
+        return [
+            cached[description] if description in cached else matched[description]
+            for description in descriptions
+        ]
+
+    def _match(self, hash_map: dict, contents) -> list:
+        """matches with the compiled matcher, chunked over worker processes when enabled"""
+        return self.__pool.match(hash_map, contents, chunk_size=self.__options["chunk_size"])
+
+    def _stage(self, name: str):
+        """times the stage when profiling is enabled"""
+        return self.profiler.stage(name) if self.profiler is not None else nullcontext()
+
+    def _update_cache(self) -> None:
+        """stores the categorization of every description into the cache and reports usage"""
+        if self.__cache is None:
+            return
+
+        categorized = self.__raw_transactions.drop_duplicates(subset='description')
+        self.__cache.remember(categorized['description'], categorized['sub_category'])
+        self.__cache.save()
+
+        LOG.info(f"categorization cache hits = {self.__cache.description_hits}, "
+                 f"misses = {self.__cache.description_misses} distinct descriptions")
+
+    @staticmethod
+    @PandasToolkit.vectorized
+    def classify_c_or_d(amount: pd.Series) -> pd.Categorical:
+        """positive amounts are earnings, the rest (NaN included) are expenditures"""
+        return pd.Categorical.from_codes(
+            np.where(amount > 0, 0, 1), categories=C_OR_D_CATEGORIES
+        )
+
+    @staticmethod
+    def recategorize(transactions: pd.DataFrame, previous_mapper: dict = None,
+                     engine: str = DEFAULT_ENGINE) -> pd.DataFrame:
+        """
+        Incremental mode: updates already processed transactions after a mapper edit
+        1. Diffs the previous and the current description_to_sub_category mapper
+        2. Finds the descriptions that contain an added/removed/reordered keyword
+        3. Re-categorizes only the rows holding those descriptions
+        The previous mapper defaults to the snapshot process_transactions kept in attrs.
+        """
+        if previous_mapper is None:
+            snapshot = transactions.attrs.get(MAPPER_SNAPSHOT_ATTR)
+            if snapshot is None:
+                LOG.error("No previous mapper given and no mapper snapshot in the attrs")
+                raise ValueError("recategorize needs the mapper the transactions were "
+                                 "categorized with")
+            previous_mapper = json.loads(snapshot)
+
+        sub_category_mapper = JsonHandler(file_path=SUB_CATEGORY_HASH_MAP_PATH)
+        changed = changed_keywords(previous_mapper, sub_category_mapper.data)
+        transactions.attrs[MAPPER_SNAPSHOT_ATTR] = json.dumps(sub_category_mapper.data)
+        if not changed:
+            LOG.info("Mapper unchanged, nothing to re-categorize")
+            return transactions
+
+        # Only the distinct descriptions are scanned for the edited keywords
+        descriptions = transactions['description'].unique()
+        detector = compile_matcher({"changed": changed}, engine=engine)
+        affected = [
+            description for description, hit in
+            zip(descriptions, detector.match_many(descriptions)) if hit
+        ]
+        rows = transactions['description'].isin(affected)
+
+        # New mapper categories cannot be written into a category dtype column
+        compact = isinstance(transactions['sub_category'].dtype, pd.CategoricalDtype)
+        if compact:
+            transactions = transactions.astype({'sub_category': object, 'category': object})
+
+        matcher = compile_matcher(sub_category_mapper.data, engine=engine)
+        sub_categories = dict(zip(affected, matcher.match_many(affected)))
+        transactions.loc[rows, 'sub_category'] = \
+            transactions.loc[rows, 'description'].map(sub_categories)
+
+        category_mapper = JsonHandler(file_path=CATEGORY_HASH_MAP_PATH)
+        transactions.loc[rows, 'category'] = transactions.loc[rows, 'sub_category'].map(
+            invert_hash_map(category_mapper.data)).fillna(NO_MATCH)
+
+        LOG.info(f"{len(changed)} keywords edited, re-categorized {rows.sum()} "
+                 f"of {len(transactions)} transactions")
+        return Processor.compact_schema(transactions) if compact else transactions
+
+    @staticmethod
+    def compact_schema(transactions: pd.DataFrame) -> pd.DataFrame:
+        """
+        Converts sub_category and category into category dtype
+        The category order follows the mapper JSON files, the no-match default comes last,
+        so the codes stay stable across runs and groupby/pivot_table work on integers.
+        """
+        sub_category_mapper = JsonHandler(file_path=SUB_CATEGORY_HASH_MAP_PATH)
+        category_mapper = JsonHandler(file_path=CATEGORY_HASH_MAP_PATH)
+
+        transactions = PandasToolkit.to_categorical(
+            transactions, column_name='sub_category',
+            categories=list(sub_category_mapper.data) + [NO_MATCH]
+        )
+        transactions = PandasToolkit.to_categorical(
+            transactions, column_name='category',
+            categories=list(category_mapper.data) + [NO_MATCH]
+        )
+        return transactions
+
     @staticmethod
     def mapper(content:str ,hash_map: dict)-> str:
         """ Will identify which of the keyword to map the category"""
@@ -30,7 +30,7 @@ class Report:
         return PandasToolkit.filter_rows(
             self.statement,
             column_name='amount',
-            condition=lambda x: x > 0
+            condition=('>', 0)
         )
 
     def expenses(self) -> pd.DataFrame | None:
@@ -38,7 +38,7 @@ class Report:
         return PandasToolkit.filter_rows(
             self.statement,
             column_name='amount',
-            condition=lambda x: x < 0
+            condition=('<', 0)
         )
 
     # Reports under Expenses
@@ -50,7 +50,7 @@ class Report:
 
         return expenses.pivot_table(index="category", columns="year_month",
                                     values='amount', aggfunc='sum', margins=True,
-                                    margins_name='Total')
+                                    margins_name='Total', observed=True)
 
     # Reports under Expenses
     def expenses_sub_category(self) -> pd.DataFrame:
@@ -61,4 +61,4 @@ class Report:
 
         return expenses.pivot_table(index="sub_category", columns="year_month",
                                     values='amount', aggfunc='sum', margins=True,
-                                    margins_name='Total')
+                                    margins_name='Total', observed=True)
@@ -0,0 +1,127 @@
+"""
+Class Name: StreamProcessor.py
+Blue+print of:streams the statements chunk by chunk into monthly aggregates with bounded memory
+"""
+# Dependencies
+import numpy as np
+import pandas as pd
+
+# Internal Dependencies
+from source.controller.processor import Processor
+from source.framework.library.a_integrator import LOG, CONFIG
+from source.framework.library.keyword_matcher import DEFAULT_ENGINE
+from source.model.fingerprint_store import FingerprintStore
+from source.model.original_statement import OriginalStatement
+from source.model.statement_formatter import create_statement_formatter
+
+# CONSTANTS
+# Rows of the aggregate table are unique on these columns
+AGGREGATE_KEYS = ['year_month', 'from_account', 'category', 'sub_category', 'c_or_d']
+
+
+class StreamProcessor:
+    """
+    Purpose: Blueprint of the out-of-core pipeline for back-fills of large archives
+             Every chunk goes through the same steps as Statements and Processor:
+             load -> format -> categorize -> monthly partial sums, only the chunk in flight
+             and the aggregate table are held in memory.
+             The amounts are summed per sign (c_or_d), so Report works on the aggregates
+             exactly like on the transactions for the category/sub_category pivots.
+             With deduplicate the rows repeated across overlapping exports are dropped like
+             in Statements, the fingerprints of the streamed rows are kept in memory.
+    Attributes:
+        chunk_size : int "rows read from a csv file at once"
+        chunks : int "chunks processed"
+        rows : int "transactions processed"
+    Methods:
+        formatted_chunks : yields the formatted chunks of every account without repeats
+        processed_chunks : yields the categorized chunks
+        monthly_aggregates : folds the processed chunks into monthly sums
+    """
+
+    def __init__(self, **kwargs):
+        """
+        Attributes:
+            chunk_size : int (default from settings)
+            accounts : list "streams only these accounts, None streams all of them"
+            engine : str "keyword matcher engine" (default aho_corasick)
+            use_cache : bool "categorization cache, loaded once per stream" (default False)
+            deduplicate : bool "drops the transactions repeated across overlapping exports"
+                          (default settings)
+        """
+        self.chunk_size: int = int(kwargs.get("chunk_size", CONFIG.get(
+            section="statement_settings", option="stream_chunk_size", fallback=100000
+        )))
+        self.__accounts: list | None = kwargs.get("accounts")
+        self.__engine: str = kwargs.get("engine", DEFAULT_ENGINE)
+        self.__use_cache: bool = kwargs.get("use_cache", False)
+        self.__deduplicate: bool = str(kwargs.get("deduplicate", CONFIG.get(
+            section="statement_settings", option="deduplicate", fallback="True"
+        ))).lower() == "true"
+        self.chunks: int = 0
+        self.rows: int = 0
+
+    def formatted_chunks(self):
+        """yields each chunk formatted to the desired format, repeats of earlier exports dropped"""
+        seen: dict = {}  # account -> fingerprints of the rows streamed so far
+        occurrences: dict = {}  # row key -> count in the export streamed
+        export = None
+        for account, path, layout, chunk in OriginalStatement.iter_statements(self.chunk_size,
+                                                                              self.__accounts):
+            statement_formatter = create_statement_formatter(account_name=account,
+                                                             statement=chunk, layout=layout)
+            formatted = statement_formatter.get_desired_format()
+            if not self.__deduplicate:
+                yield formatted
+                continue
+
+            # The identical rows of one export are numbered across its chunks
+            if export != (account, path):
+                export, occurrences = (account, path), {}
+            fingerprints = FingerprintStore.fingerprint(formatted, occurrences=occurrences)
+            known = seen.setdefault(account, set())
+            keep = np.fromiter((fingerprint not in known for fingerprint in fingerprints.tolist()),
+                               dtype=bool, count=len(fingerprints))
+            known.update(fingerprints.tolist())
+            if not keep.all():
+                LOG.debug(f"{len(keep) - keep.sum()} repeated transactions dropped from {path = }")
+                formatted = formatted[keep].reset_index(drop=True)
+            if not formatted.empty:
+                yield formatted
+
+    def processed_chunks(self):
+        """yields each formatted chunk with its sub_category, category and c_or_d"""
+        # One Processor for the stream, its cache, settings and workers are kept per chunk
+        processor = Processor(engine=self.__engine, use_cache=self.__use_cache)
+        try:
+            for chunk in self.formatted_chunks():
+                self.chunks += 1
+                self.rows += len(chunk)
+                yield processor.process(chunk)
+        finally:
+            processor.close()
+
+    def monthly_aggregates(self) -> pd.DataFrame:
+        """
+        Folds every processed chunk into the running monthly sums
+        returns one row per AGGREGATE_KEYS with the summed amount and the transactions count
+        """
+        aggregate = None
+        for chunk in self.processed_chunks():
+            chunk['year_month'] = chunk['transaction_date'].dt.to_period('M')
+            partial = chunk.groupby(AGGREGATE_KEYS, observed=True, dropna=False).agg(
+                amount=('amount', 'sum'), transactions=('amount', 'size')
+            )
+
+            if aggregate is None:
+                aggregate = partial
+            else:
+                aggregate = pd.concat([aggregate, partial]).groupby(
+                    level=AGGREGATE_KEYS, observed=True, dropna=False
+                ).sum()
+            LOG.debug(f"chunk {self.chunks} folded, {len(aggregate)} aggregate rows")
+
+        LOG.info(f"streamed {self.rows} transactions in {self.chunks} chunks")
+        if aggregate is None:
+            return pd.DataFrame(columns=AGGREGATE_KEYS + ['amount', 'transactions'])
+        return aggregate.reset_index()
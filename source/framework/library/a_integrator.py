@@ -8,6 +8,12 @@ from source.framework.library import logger, config_manager
 CONFIG = config_manager.CONFIG
 LOG = logger.LOG
 TABLE_HEADER = ['transaction_date','description','amount','from_account']
+TABLE_SCHEMA = {
+    'transaction_date': 'datetime64[ns]',
+    'description': 'object',
+    'amount': 'float64',
+    'from_account': 'object'
+}
 
 # [Enums]
 # Deprecated
@@ -50,6 +50,10 @@ class ConfigManager:
             LOG.exception(f"An error occurred while setting up logging: {e}")
             return fallback
 
+    def has_section(self, section:str) -> bool:
+        """ checks whether the settings file holds the section, nothing is logged"""
+        return self.config.has_section(section)
+
     def get_options(self, section:str)-> list | None:
         """ returns all the option under a list"""
         try:
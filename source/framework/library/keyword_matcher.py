@@ -0,0 +1,363 @@
+"""
+Class Name: KeywordMatcher.py
+Blue+print of:compiled keyword matchers that map a text to the first matching category
+"""
+# Dependencies
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+# Internal Dependencies
+from source.framework.library.a_integrator import LOG
+
+# CONSTANTS
+DEFAULT_ENGINE = "aho_corasick"
+NO_MATCH = ""  # Returned when none of the keywords are found
+_WORKER_STATE: dict = {}  # matcher compiled once per worker process
+
+
+class NaiveMatcher:
+    """
+    Purpose: Blueprint of the original nested-loop keyword scan
+    Attributes:
+        categories : list "categories in hash map order"
+        keywords : list "lower cased keywords per category"
+    Methods:
+        match : returns the first category whose keyword is found in the content
+        match_many : returns the category of each content
+    """
+
+    def __init__(self, hash_map: dict):
+        """
+        Attributes:
+            hash_map : dict "category -> list of keywords"
+        """
+        self.categories: list = list(hash_map.keys())
+        self.keywords: list = [
+            [keyword.lower() for keyword in keywords] for keywords in hash_map.values()
+        ]
+
+    def match(self, content: str) -> str:
+        """ Will identify which of the keyword to map the category"""
+        content = content.lower()
+        for category, keywords in zip(self.categories, self.keywords):
+            for keyword in keywords:
+                if keyword in content:
+                    return category
+        return NO_MATCH
+
+    def match_many(self, contents) -> list:
+        """ returns the category of each content in the same order"""
+        return [self.match(content) for content in contents]
+
+
+class AhoCorasickMatcher:
+    """
+    Purpose: Blueprint of an Aho-Corasick automaton built once per hash map
+             Scans each content in a single pass and keeps the first-match-in-JSON-order
+             semantics of the naive scan (the earliest category with any keyword wins).
+    Attributes:
+        categories : list "categories in hash map order"
+        __goto : list "transitions of each state"
+        __fail : list "failure link of each state"
+        __best : list "lowest category index reachable from each state, None if none"
+    Methods:
+        match : returns the first category whose keyword is found in the content
+        match_many : returns the category of each content
+    """
+
+    def __init__(self, hash_map: dict):
+        """
+        Attributes:
+            hash_map : dict "category -> list of keywords"
+        """
+        self.categories: list = list(hash_map.keys())
+        self.__goto: list = [{}]
+        self.__fail: list = [0]
+        self.__best: list = [None]
+
+        for priority, keywords in enumerate(hash_map.values()):
+            for keyword in keywords:
+                self.__add_keyword(keyword.lower(), priority)
+
+        self.__build_failure_links()
+        LOG.debug(f"Aho-Corasick automaton built with {len(self.__goto)} states")
+
+    def __add_keyword(self, keyword: str, priority: int) -> None:
+        """adds the keyword to the trie and keeps the lowest priority on its end state"""
+        state = 0
+        for char in keyword:
+            next_state = self.__goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.__goto)
+                self.__goto[state][char] = next_state
+                self.__goto.append({})
+                self.__fail.append(0)
+                self.__best.append(None)
+            state = next_state
+
+        if self.__best[state] is None or priority < self.__best[state]:
+            self.__best[state] = priority
+
+    def __build_failure_links(self) -> None:
+        """breadth first walk that sets failure links and merges outputs along them"""
+        queue = deque(self.__goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.__goto[state].items():
+                queue.append(next_state)
+
+                # Longest proper suffix of next_state that is also in the trie
+                fallback = self.__fail[state]
+                while fallback and char not in self.__goto[fallback]:
+                    fallback = self.__fail[fallback]
+                fail_state = self.__goto[fallback].get(char, 0)
+                self.__fail[next_state] = fail_state
+
+                # A state also reports every keyword that ends on its failure chain
+                inherited = self.__best[fail_state]
+                if inherited is not None and (
+                        self.__best[next_state] is None or inherited < self.__best[next_state]):
+                    self.__best[next_state] = inherited
+
+    def match(self, content: str) -> str:
+        """ Will identify which of the keyword to map the category"""
+        goto, fail, best = self.__goto, self.__fail, self.__best
+
+        found = best[0]  # an empty keyword matches every content
+        if found == 0:
+            return self.categories[0]
+
+        state = 0
+        for char in content.lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            priority = best[state]
+            if priority is not None and (found is None or priority < found):
+                found = priority
+                if found == 0:
+                    break
+
+        return NO_MATCH if found is None else self.categories[found]
+
+    def match_many(self, contents) -> list:
+        """ returns the category of each content in the same order"""
+        return [self.match(content) for content in contents]
+
+
+class RegexMatcher:
+    """
+    Purpose: Blueprint of a vectorized matcher built on pandas string methods
+             Each category's keywords are compiled into one escaped regex alternation and
+             evaluated with Series.str.contains in hash map order, a category only claims
+             the contents that are still unassigned, so the first match wins.
+    Attributes:
+        categories : list "categories in hash map order"
+        patterns : list "alternation of the lower cased keywords per category"
+    Methods:
+        match : returns the first category whose keyword is found in the content
+        match_many : returns the category of each content
+    """
+
+    def __init__(self, hash_map: dict):
+        """
+        Attributes:
+            hash_map : dict "category -> list of keywords"
+        """
+        self.categories: list = list(hash_map.keys())
+        self.patterns: list = [
+            "|".join(re.escape(keyword.lower()) for keyword in keywords) if keywords else None
+            for keywords in hash_map.values()
+        ]
+
+    def match(self, content: str) -> str:
+        """ Will identify which of the keyword to map the category"""
+        return self.match_many([content])[0]
+
+    def match_many(self, contents) -> list:
+        """ returns the category of each content in the same order"""
+        lowered = pd.Series(list(contents), dtype=object).str.lower()
+        result = np.full(len(lowered), NO_MATCH, dtype=object)
+        unassigned = np.ones(len(lowered), dtype=bool)
+
+        for category, pattern in zip(self.categories, self.patterns):
+            if not unassigned.any():
+                break
+            if pattern is None:
+                continue
+
+            # Only the still unassigned contents are scanned for this category
+            hits = lowered[unassigned].str.contains(pattern, regex=True, na=False).to_numpy()
+            claimed = np.flatnonzero(unassigned)[hits]
+            result[claimed] = category
+            unassigned[claimed] = False
+
+        return result.tolist()
+
+
+def invert_hash_map(hash_map: dict) -> dict:
+    """
+    returns {keyword: category} for exact lookups
+
+    A keyword listed under several categories keeps the first one in hash map order,
+    the same category the substring scan would have returned.
+    """
+    inverted = {}
+    for category, keywords in hash_map.items():
+        for keyword in keywords:
+            if keyword not in inverted:
+                inverted[keyword] = category
+            elif inverted[keyword] != category:
+                LOG.debug(f"{keyword = } listed under {inverted[keyword]} and {category}, "
+                          f"keeping {inverted[keyword]}")
+    return inverted
+
+
+def changed_keywords(old_map: dict, new_map: dict) -> list:
+    """
+    returns the lower cased keywords whose edit can change the category of a content
+
+    1. Keywords added, removed or moved to another category
+    2. Every keyword of a category whose position among the kept categories changed
+    A content that contains none of them maps to the same category under both hash maps.
+    """
+    def pairs(hash_map: dict) -> set:
+        return {(category, keyword.lower())
+                for category, keywords in hash_map.items() for keyword in keywords}
+
+    changed = {keyword for _, keyword in pairs(old_map) ^ pairs(new_map)}
+
+    # Reordering only matters between categories present in both hash maps
+    old_order = [category for category in old_map if category in new_map]
+    new_order = [category for category in new_map if category in old_map]
+    for old_category, new_category in zip(old_order, new_order):
+        if old_category != new_category:
+            changed.update(keyword.lower() for keyword in old_map[old_category])
+            changed.update(keyword.lower() for keyword in new_map[new_category])
+
+    return sorted(changed)
+
+
+# [Engines]
+MATCHER_ENGINES = {
+    "aho_corasick": AhoCorasickMatcher,
+    "regex": RegexMatcher,
+    "naive": NaiveMatcher,
+}
+
+
+@lru_cache(maxsize=16)
+def _compile(frozen_map: tuple, engine: str):
+    """builds the matcher once per (hash map, engine) pair"""
+    return MATCHER_ENGINES[engine](
+        {category: list(keywords) for category, keywords in frozen_map}
+    )
+
+
+def compile_matcher(hash_map: dict, engine: str = DEFAULT_ENGINE):
+    """
+    returns a compiled matcher of the requested engine for the hash map
+
+    Raises:
+    - ValueError: If the engine is not one of MATCHER_ENGINES.
+    """
+    if engine not in MATCHER_ENGINES:
+        LOG.error(f"Unknown matcher engine {engine = }")
+        raise ValueError(
+            f"Unknown matcher engine '{engine}', expected one of {list(MATCHER_ENGINES)}"
+        )
+
+    frozen_map = tuple((category, tuple(keywords)) for category, keywords in hash_map.items())
+    return _compile(frozen_map, engine)
+
+
+def _init_worker(hash_map: dict, engine: str) -> None:
+    """compiles the matcher once when a worker process starts"""
+    _WORKER_STATE["matcher"] = compile_matcher(hash_map, engine=engine)
+
+
+def _match_chunk(contents: list) -> list:
+    """matches one chunk inside a worker process"""
+    return _WORKER_STATE["matcher"].match_many(contents)
+
+
+class MatcherPool:
+    """
+    Purpose: Blueprint of a process pool whose workers keep a compiled matcher
+             The pool lives until close, the hash map is shipped once per worker for the
+             whole lifetime instead of once per call (e.g. once per streamed chunk).
+             A different hash map restarts the workers.
+    Attributes:
+        workers : int
+        engine : str
+    Methods:
+        match : returns the category of each content, chunked over the workers
+        close : shuts the workers down
+    """
+
+    def __init__(self, workers: int, engine: str = DEFAULT_ENGINE):
+        """
+        Attributes:
+            workers : int "processes, 1 matches in the current process"
+            engine : str "keyword matcher engine"
+        """
+        self.workers: int = workers
+        self.engine: str = engine
+        self.__executor: ProcessPoolExecutor | None = None
+        self.__frozen_map: tuple | None = None  # hash map the workers were started with
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def match(self, hash_map: dict, contents, chunk_size: int = 50000) -> list:
+        """
+        returns the category of each content, the contents are split into chunks and
+        matched on the workers, the results keep the order of the contents
+        """
+        contents = list(contents)
+        if self.workers <= 1 or len(contents) <= chunk_size:
+            return compile_matcher(hash_map, engine=self.engine).match_many(contents)
+
+        frozen_map = tuple((category, tuple(keywords)) for category, keywords in hash_map.items())
+        if self.__executor is None or frozen_map != self.__frozen_map:
+            self.close()
+            self.__executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                  initializer=_init_worker,
+                                                  initargs=(hash_map, self.engine))
+            self.__frozen_map = frozen_map
+
+        chunks = [contents[start:start + chunk_size]
+                  for start in range(0, len(contents), chunk_size)]
+        LOG.debug(f"matching {len(contents)} contents in {len(chunks)} chunks "
+                  f"on {self.workers} workers")
+        return [category for chunk in self.__executor.map(_match_chunk, chunks)
+                for category in chunk]
+
+    def close(self) -> None:
+        """shuts the workers down, the next match starts new ones"""
+        if self.__executor is not None:
+            self.__executor.shutdown()
+            self.__executor = None
+            self.__frozen_map = None
+
+
+def match_in_parallel(hash_map: dict, contents, engine: str = DEFAULT_ENGINE,
+                      workers: int = 1, chunk_size: int = 50000) -> list:
+    """
+    returns the category of each content, the contents are split into chunks and
+    matched in a process pool, the results keep the order of the contents
+
+    The hash map is shipped once per worker, not once per chunk. Repeated calls should
+    share a MatcherPool instead, this one starts and stops its own workers.
+    """
+    with MatcherPool(workers, engine=engine) as pool:
+        return pool.match(hash_map, contents, chunk_size=chunk_size)
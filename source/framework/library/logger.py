@@ -4,9 +4,9 @@ Blue+print of:Central logging
 """
 # Dependencies
 import os
+import sys
 import datetime
 import logging
-import inspect
 import configparser
 from tabulate import tabulate
 
@@ -15,6 +15,10 @@ from tabulate import tabulate
 
 # [CONSTANTS]
 LOG_CONFIG_PATH = 'framework/settings/log_settings.ini'
+TABLE_MAX_ROWS = 20  # rows rendered by LOG.table, half from the head and half from the tail
+
+# (file, function) -> "function -> file" part of the tag, one entry per logging function
+_TAG_PREFIXES: dict = {}
 
 # Class
 class Logger:
@@ -43,6 +47,8 @@ class Logger:
                 log_file_format = config.get('log_settings', 'log_file_format')
                 log_level = config.get('log_settings', 'log_level')
                 log_directory = config.get('log_settings', 'log_directory')
+                self.table_max_rows = config.getint('log_settings', 'table_max_rows',
+                                                    fallback=TABLE_MAX_ROWS)
 
                 # Create the log directory if it doesn't exist
                 if not os.path.exists(log_directory):
@@ -108,19 +114,31 @@ class Logger:
     def get_tag_info(frame_index = 2)-> str:
         """returns tag mark to file """
 
-        # Get the caller's stack frame information [2] is the actual tag caller.
-        frame = inspect.stack()[frame_index]  # [0] is the current frame, [1] is the caller frame
-        function_name = frame.function
-        file_name = os.path.basename(frame.filename)  # Only get the file name
-        line_number = frame.lineno
+        # Get the caller's frame [2] is the actual tag caller.
+        try:
+            # [0] is the current frame, [1] is the caller frame
+            # _getframe is public in practice, inspect.stack builds every frame's context
+            frame = sys._getframe(frame_index)  # pylint: disable=protected-access
+        except ValueError:
+            return ""
+
+        # Only the line changes between the calls of a function
+        code = frame.f_code
+        key = (code.co_filename, code.co_name)
+        prefix = _TAG_PREFIXES.get(key)
+        if prefix is None:
+            prefix = _TAG_PREFIXES[key] = \
+                f'{code.co_name} -> {os.path.basename(code.co_filename)}'
 
-        return f'{function_name} -> {file_name} :: {line_number}'
+        return f'{prefix} :: {frame.f_lineno}'
 
     @staticmethod
     def debug(message="")-> None:
         """
         Debug level logging with a tag and message.
         """
+        if not Logger.__get_logger().isEnabledFor(logging.DEBUG):
+            return
         tag = Logger.get_tag_info()
 
         Logger.__log(logging.DEBUG, tag, message)
@@ -130,6 +148,8 @@ class Logger:
         """
         Info level logging with a tag and message.
         """
+        if not Logger.__get_logger().isEnabledFor(logging.INFO):
+            return
         tag = Logger.get_tag_info()
 
         Logger.__log(logging.INFO, tag, message)
@@ -139,6 +159,8 @@ class Logger:
         """
         Error level logging with a tag and message.
         """
+        if not Logger.__get_logger().isEnabledFor(logging.ERROR):
+            return
         tag = Logger.get_tag_info()
 
         Logger.__log(logging.ERROR, tag, message)
@@ -148,6 +170,8 @@ class Logger:
         """
         Critical level logging with a tag and message.
         """
+        if not Logger.__get_logger().isEnabledFor(logging.CRITICAL):
+            return
         tag = Logger.get_tag_info()
 
         Logger.__log(logging.CRITICAL, tag, message)
@@ -163,13 +187,51 @@ class Logger:
         logger.error(log_message, exc_info=True, extra={'tag': tag})
 
     @staticmethod
-    def table(table=None,header=None)-> None:
+    def is_enabled(level)-> bool:
+        """ returns True if a record of the level reaches at least one handler"""
+        logger = Logger.__get_logger()
+        if not logger.isEnabledFor(level):
+            return False
+
+        while logger is not None:
+            if any(level >= handler.level for handler in logger.handlers):
+                return True
+            logger = logger.parent if logger.propagate else None
+        return logging.lastResort is not None and level >= logging.lastResort.level
+
+    @staticmethod
+    def table(table=None,header=None, max_rows=None)-> None:
         """
-        Logs an exception with a stack trace. Should be used inside an `except` block.
+        Debug level logging of a table, rendered only when DEBUG records are handled.
+        Long tables show their first and last rows with the count of the hidden ones.
+
+        :param table: pd.DataFrame or any sequence of rows tabulate accepts.
+        :param header: The column names.
+        :param max_rows: Rows rendered, the log_settings table_max_rows by default, 0 for all.
         """
+        if not Logger.is_enabled(logging.DEBUG):
+            return
+
         tag = Logger.get_tag_info()
 
-        log_message = "\n" + tabulate(table, headers=header, tablefmt="grid")
+        if max_rows is None:
+            max_rows = getattr(Logger._instance, "table_max_rows", TABLE_MAX_ROWS)
+        total_rows = len(table) if table is not None else 0
+
+        if 0 < max_rows < total_rows:
+            # Head and tail are rendered as two grids, the rows in between are never copied
+            head_rows = (max_rows + 1) // 2
+            tail_rows = max_rows - head_rows
+            rows = table.iloc if hasattr(table, "iloc") else list(table)
+            rendered = tabulate(rows[:head_rows], headers=header, tablefmt="grid")
+            if tail_rows:
+                rendered += "\n...\n" + tabulate(rows[total_rows - tail_rows:], headers=header,
+                                                  tablefmt="grid")
+            rendered += f"\n[{total_rows} rows, {total_rows - max_rows} not shown]"
+        else:
+            rendered = tabulate(table, headers=header, tablefmt="grid")
+
+        log_message = "\n" + rendered
         Logger.__log(logging.DEBUG, tag, log_message)
 
 
@@ -3,16 +3,35 @@ Class Name: PandasToolkit.py
 Blue+print of:contains various methods for Dataframe operations
 """
 # Dependencies
+import os
+import pickle
+import operator
+from importlib.util import find_spec
+import numpy as np
 import pandas as pd
+from pandas.tseries.api import guess_datetime_format
 
 # Internal Dependencies
 from source.framework.library.a_integrator import LOG
 
+# [CONSTANTS]
+PYARROW_AVAILABLE = find_spec("pyarrow") is not None  # optional, faster CSV engine and IPC
+if PYARROW_AVAILABLE:
+    import pyarrow as pa
+
 # [class]
 class PandasToolkit:
     """
     Purpose: Blueprint of contains various methods for Dataframe operations
     """
+    # Vectorized specs accepted by filter_rows and modify_column
+    COMPARISONS = {
+        '>': operator.gt, '>=': operator.ge, '<': operator.lt,
+        '<=': operator.le, '==': operator.eq, '!=': operator.ne,
+    }
+    OPERATIONS = {
+        '+': operator.add, '-': operator.sub, '*': operator.mul, '/': operator.truediv,
+    }
 
     @staticmethod
     def load_csv(file_path,**kwargs) -> pd.DataFrame | None:
@@ -28,6 +47,189 @@ class PandasToolkit:
             LOG.exception(message=f"{e = }")
             return None
 
+    @staticmethod
+    def load_csv_columns(file_path, columns, dtypes: dict = None,
+                         engine: str = "auto") -> pd.DataFrame | None:
+        """
+        To perform: loads only the wanted columns of the csv file with explicit dtypes
+
+        Parameters:
+        - file_path (str): The csv file.
+        - columns (iterable): The columns to keep, the ones missing in the file are skipped.
+        - dtypes (dict, optional): column -> dtype, columns that are not listed are inferred.
+        - engine (str): "auto" uses pyarrow when it is installed, otherwise "c",
+                        or any engine pd.read_csv accepts.
+
+        Returns:
+        - pd.DataFrame: The pruned statement, None if the file could not be loaded or a
+                        numeric column holds a value that is not a number.
+        """
+        try:
+            LOG.debug(message=f"Trying to reading the csv columns from {file_path = }")
+
+            usecols, dtype = PandasToolkit.__prune_columns(file_path, columns, dtypes)
+
+            if engine == "auto":
+                engine = "pyarrow" if PYARROW_AVAILABLE else "c"
+
+            try:
+                return pd.read_csv(file_path, usecols=usecols, dtype=dtype, engine=engine)
+            except ValueError as e:
+                # e.g. "$1,234.00" in an amount column, read as text then parsed
+                LOG.error(f"Explicit dtypes rejected for {file_path = }, parsing the text {e = }")
+                return PandasToolkit.__parse_numbers(
+                    pd.read_csv(file_path, usecols=usecols, engine=engine,
+                                dtype=PandasToolkit.__numbers_as_text(dtype)), dtype
+                )
+
+        except (FileNotFoundError, ValueError) as e:
+            LOG.debug(message=f"csv_file_path = {file_path= }")
+            LOG.exception(message=f"{e = }")
+            return None
+
+    @staticmethod
+    def iter_csv_columns(file_path, columns, dtypes: dict = None, chunk_size: int = 100000):
+        """
+        To perform: streams the wanted columns of the csv file, chunk_size rows at a time
+
+        Parameters:
+        - file_path (str): The csv file.
+        - columns (iterable): The columns to keep, the ones missing in the file are skipped.
+        - dtypes (dict, optional): column -> dtype, columns that are not listed are inferred.
+        - chunk_size (int): Rows per yielded DataFrame, bounds the memory used.
+
+        Yields:
+        - pd.DataFrame: The pruned chunks in file order, nothing if the file could not be read.
+
+        Raises:
+        - ValueError: A numeric column holds a value that is not a number.
+        """
+        try:
+            usecols, dtype = PandasToolkit.__prune_columns(file_path, columns, dtypes)
+        except (FileNotFoundError, ValueError) as e:
+            LOG.debug(message=f"csv_file_path = {file_path= }")
+            LOG.exception(message=f"{e = }")
+            return
+
+        # pyarrow reads whole files only, the C engine is the one that streams
+        streamed = 0
+        try:
+            with pd.read_csv(file_path, usecols=usecols, dtype=dtype, engine="c",
+                             chunksize=chunk_size) as reader:
+                for chunk in reader:
+                    streamed += len(chunk)
+                    yield chunk
+        except ValueError as e:
+            # e.g. "$1,234.00" in an amount column, the rest of the file is read as text
+            # then parsed, the rows already streamed are skipped
+            LOG.error(f"Explicit dtypes rejected for {file_path = }, parsing the text {e = }")
+            with pd.read_csv(file_path, usecols=usecols, engine="c", chunksize=chunk_size,
+                             dtype=PandasToolkit.__numbers_as_text(dtype),
+                             skiprows=range(1, streamed + 1)) as reader:
+                for chunk in reader:
+                    yield PandasToolkit.__parse_numbers(chunk, dtype)
+
+    @staticmethod
+    def __prune_columns(file_path, columns, dtypes: dict | None) -> tuple:
+        """
+        returns (usecols, dtype) of the wanted columns present in the csv file,
+        only the header row is parsed
+        """
+        header = pd.read_csv(file_path, nrows=0).columns
+        wanted = set(columns)
+        usecols = [column for column in header if column in wanted]
+        dtype = {column: dtypes[column] for column in usecols if column in (dtypes or {})}
+        return usecols, dtype
+
+    @staticmethod
+    def __guess_date_format(column: pd.Series) -> str | None:
+        """returns the strftime format of the first date string, None if it cannot be told"""
+        first = column.dropna()
+        if first.empty or not isinstance(first.iloc[0], str):
+            return None
+        return guess_datetime_format(first.iloc[0])
+
+    @staticmethod
+    def __is_number(dtype) -> bool:
+        """checks whether the dtype is numeric"""
+        return pd.api.types.is_numeric_dtype(pd.api.types.pandas_dtype(dtype))
+
+    @staticmethod
+    def __numbers_as_text(dtypes: dict) -> dict:
+        """returns the dtypes with the numeric columns read as text, see __parse_numbers"""
+        return {column: 'string' if PandasToolkit.__is_number(dtype) else dtype
+                for column, dtype in dtypes.items()}
+
+    @staticmethod
+    def __parse_numbers(df: pd.DataFrame, dtypes: dict) -> pd.DataFrame:
+        """
+        converts the numeric columns of dtypes read as text, currency symbols, spaces and
+        thousands separators are dropped ("$1,234.00", "-1,030.00")
+        raises ValueError naming the first value that is still not a number
+        """
+        for column, dtype in dtypes.items():
+            if not PandasToolkit.__is_number(dtype):
+                continue
+            text = df[column].str.replace(r"[\s,$€£]", "", regex=True)
+            numbers = pd.to_numeric(text, errors='coerce')
+            invalid = numbers.isna() & text.notna() & (text != "")
+            if invalid.any():
+                LOG.error(f"{column = } holds {invalid.sum()} values that are not numbers")
+                raise ValueError(f"Not a number in column '{column}': "
+                                 f"'{df.loc[invalid, column].iloc[0]}'")
+            df[column] = numbers.astype(dtype)
+        return df
+
+    @staticmethod
+    def save_frame(df: pd.DataFrame, file_path: str) -> str:
+        """
+        Saves the DataFrame in a binary format, Parquet when pyarrow is installed,
+        pickle otherwise. The extension of `file_path` is replaced accordingly.
+
+        Returns:
+        - str: The path the DataFrame was written to.
+        """
+        stem = os.path.splitext(file_path)[0]
+        if PYARROW_AVAILABLE:
+            file_path = stem + ".parquet"
+            df.to_parquet(file_path, index=False)
+        else:
+            file_path = stem + ".pkl"
+            df.to_pickle(file_path)
+        return file_path
+
+    @staticmethod
+    def load_frame(file_path: str) -> pd.DataFrame | None:
+        """ To perform: loads a DataFrame written by save_frame, None if it is unreadable"""
+        try:
+            if file_path.endswith(".parquet"):
+                return pd.read_parquet(file_path)
+            return pd.read_pickle(file_path)
+        except (OSError, ValueError, ImportError) as e:
+            LOG.error(f"Could not load the frame {file_path = } {e = }")
+            return None
+
+    @staticmethod
+    def to_bytes(df: pd.DataFrame) -> bytes:
+        """
+        Serializes the DataFrame to send it back from another process, as an Arrow IPC stream
+        when pyarrow is installed (columnar buffers, no per-object pickling), pickle otherwise.
+        """
+        if PYARROW_AVAILABLE:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            return b"arrow" + sink.getvalue().to_pybytes()
+        return b"pickle" + pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def from_bytes(data: bytes) -> pd.DataFrame:
+        """ To perform: rebuilds a DataFrame serialized by to_bytes"""
+        if data.startswith(b"arrow"):
+            return pa.ipc.open_stream(data[len(b"arrow"):]).read_all().to_pandas()
+        return pickle.loads(data[len(b"pickle"):])
+
     @staticmethod
     def combine_first_column(df :pd.DataFrame,col1 :str, col2 :str, new_column :str)-> pd.DataFrame:
         """
@@ -78,6 +280,42 @@ class PandasToolkit:
         # Concatenate the DataFrames
         return pd.concat([df1, df2], axis=axis, ignore_index=ignore_index)
 
+    @staticmethod
+    def concat_many(frames: list, schema: dict = None, ignore_index=True) -> pd.DataFrame:
+        """
+        Concatenate any number of DataFrames row-wise in a single pass with column validation.
+
+        Parameters:
+        - frames (list): The DataFrames to concatenate.
+        - schema (dict, optional): column -> dtype, every frame must hold exactly these columns
+                                   and the result is cast to these dtypes in this order.
+                                   Without a schema the columns of the first frame are used.
+        - ignore_index (bool): Whether to ignore index and reindex in the concatenated DataFrame.
+
+        Returns:
+        - pd.DataFrame: The concatenated DataFrame, an empty one with the schema if no frames.
+
+        Raises:
+        - ValueError: If the columns of a frame do not match the expected columns.
+        """
+        if not frames:
+            return pd.DataFrame({column: pd.Series(dtype=dtype)
+                                 for column, dtype in (schema or {}).items()})
+
+        columns = list(schema) if schema is not None else list(frames[0].columns)
+        for position, frame in enumerate(frames):
+            if set(frame.columns) != set(columns):
+                missing = set(columns) - set(frame.columns)
+                unexpected = set(frame.columns) - set(columns)
+                LOG.error(f"\n {position = } \n {missing = } \n {unexpected = }")
+                raise ValueError(
+                    f"Concatenation failed: frame {position} is missing columns {missing}, "
+                    f"has unexpected columns {unexpected}"
+                )
+
+        combined = pd.concat(frames, axis=0, ignore_index=ignore_index)[columns]
+        return combined.astype(schema, copy=False) if schema is not None else combined
+
     @staticmethod
     def rename_columns(df, columns_mapping:dict) -> pd.DataFrame:
         """
@@ -127,6 +365,54 @@ class PandasToolkit:
         # Filter the DataFrame to include only the specified columns
         return df[columns]
 
+    @staticmethod
+    def parse_dates(column: pd.Series, date_format: str = None) -> pd.Series:
+        """
+        Convert a column of date strings to datetime64, each distinct string is parsed once.
+
+        Parameters:
+        - column (pd.Series): The date strings, a datetime column is returned unchanged.
+        - date_format (str, optional): The strftime format, e.g. "%m/%d/%Y". Without it
+                                       the format is inferred from the first date, when it
+                                       does not match every date is inferred on its own
+                                       (slow fallback).
+
+        Returns:
+        - pd.Series: The parsed dates with the index of the column, NaT for missing values.
+        """
+        if pd.api.types.is_datetime64_any_dtype(column):
+            return column
+
+        if date_format is None:
+            date_format = PandasToolkit.__guess_date_format(column)
+            LOG.debug(f"{column.name} dates guessed as {date_format}")
+
+        # Long histories repeat the same few thousand dates
+        codes, uniques = pd.factorize(column)
+        try:
+            parsed = pd.to_datetime(uniques, format=date_format)
+        except (ValueError, TypeError) as e:
+            LOG.error(f"Dates do not match {date_format = }, inferring each one {e = }")
+            parsed = pd.to_datetime(uniques, format="mixed")
+
+        # code -1 (missing value) picks the NaT appended last
+        values = np.append(parsed.to_numpy(dtype='datetime64[ns]'), np.datetime64('NaT'))
+        return pd.Series(values[codes], index=column.index, name=column.name)
+
+    @staticmethod
+    def vectorized(func):
+        """
+        Marks a function as vectorized: it takes a whole pd.Series (or pd.DataFrame) and
+        returns values for every row, so the toolkit calls it once instead of per element.
+        """
+        func.vectorized = True
+        return func
+
+    @staticmethod
+    def __is_vectorized(func) -> bool:
+        """returns True if the function works on a whole column at once"""
+        return isinstance(func, np.ufunc) or getattr(func, "vectorized", False)
+
     @staticmethod
     def add_column(df, column_name, value=None, func=None,source_column=None) -> pd.DataFrame:
         """
@@ -138,7 +424,10 @@ class PandasToolkit:
         - value (optional): A constant value to assign to the new column for all rows.
         - func (callable, optional): A function to generate values for the new column.
                                      If provided, it overrides `value`.
-                                     The function will be applied row-wise.
+                                     The function will be applied row-wise, unless it is
+                                     vectorized (a numpy ufunc or marked with
+                                     `PandasToolkit.vectorized`), then it is called once
+                                     with the whole column (or DataFrame).
         - source_column (str, optional): The name of an existing column in the DataFrame.
                                           If provided, the new column values will be derived
                                           from this existing column using the function `func`.
@@ -151,7 +440,13 @@ class PandasToolkit:
         """
         if source_column is not None and source_column in df.columns:
             # Derive values from an existing column using the provided function
-            df[column_name] = df[source_column].apply(func)
+            if PandasToolkit.__is_vectorized(func):
+                df[column_name] = func(df[source_column])
+            else:
+                df[column_name] = df[source_column].apply(func)
+        elif func is not None and PandasToolkit.__is_vectorized(func):
+            # Vectorized function gets the whole DataFrame at once
+            df[column_name] = func(df)
         elif func is not None:
             # Apply a function row-wise to generate the column values
             df[column_name] = df.apply(func, axis=1)
@@ -164,6 +459,95 @@ class PandasToolkit:
 
         return df
 
+    @staticmethod
+    def add_column_from_unique(df, column_name, source_column, func) -> pd.DataFrame:
+        """
+        Add a new column by applying a function to the distinct values of a source column only.
+
+        The source column is factorized, `func` is called once with the array of distinct
+        values and the results are scattered back to every row through the integer codes.
+
+        Parameters:
+        - df (pd.DataFrame): The DataFrame to add the column to.
+        - column_name (str): The name of the new column to add.
+        - source_column (str): The name of an existing column to derive the values from.
+        - func (callable): A function that takes the array of distinct values and returns
+                           a sequence of results of the same length and order.
+
+        Returns:
+        - pd.DataFrame: The DataFrame with the new column added.
+
+        Raises:
+        - ValueError: If the source column does not exist in the DataFrame.
+        """
+        if source_column not in df.columns:
+            LOG.error(f"Column '{source_column}' not found in the DataFrame.")
+            raise ValueError(f"Column '{source_column}' not found in the DataFrame.")
+
+        # Missing values are kept as their own distinct value, so func sees them like apply did
+        codes, uniques = pd.factorize(df[source_column], use_na_sentinel=False)
+        results = np.asarray(func(uniques), dtype=object)
+
+        LOG.debug(f"{column_name} derived from {len(uniques)} distinct of {len(df)} rows")
+        df[column_name] = results[codes]
+        return df
+
+    @staticmethod
+    def map_column(df, column_name, source_column, mapping: dict, default=None) -> pd.DataFrame:
+        """
+        Add a new column by looking up every value of a source column in a dictionary.
+
+        Parameters:
+        - df (pd.DataFrame): The DataFrame to add the column to.
+        - column_name (str): The name of the new column to add.
+        - source_column (str): The name of an existing column holding the lookup keys.
+        - mapping (dict): The lookup table.
+        - default (optional): The value used for keys missing in the mapping.
+
+        Returns:
+        - pd.DataFrame: The DataFrame with the new column added.
+
+        Raises:
+        - ValueError: If the source column does not exist in the DataFrame.
+        """
+        if source_column not in df.columns:
+            LOG.error(f"Column '{source_column}' not found in the DataFrame.")
+            raise ValueError(f"Column '{source_column}' not found in the DataFrame.")
+
+        column = df[source_column].map(mapping)
+        df[column_name] = column if default is None else column.fillna(default)
+        return df
+
+    @staticmethod
+    def to_categorical(df, column_name, categories: list) -> pd.DataFrame:
+        """
+        Convert a column to the pandas category dtype with a fixed category order.
+
+        Parameters:
+        - df (pd.DataFrame): The DataFrame holding the column.
+        - column_name (str): The name of the column to convert.
+        - categories (list): The categories in their stable order, values that are not
+                             listed are appended after them.
+
+        Returns:
+        - pd.DataFrame: The DataFrame with the converted column.
+
+        Raises:
+        - ValueError: If the specified column does not exist in the DataFrame.
+        """
+        if column_name not in df.columns:
+            LOG.error(f"Column '{column_name}' not found in the DataFrame.")
+            raise ValueError(f"Column '{column_name}' not found in the DataFrame.")
+
+        categories = list(dict.fromkeys(categories))
+        unlisted = set(df[column_name].dropna().unique()) - set(categories)
+        if unlisted:
+            LOG.debug(f"{column_name} values missing from the categories {unlisted = }")
+            categories += sorted(unlisted, key=str)
+
+        df[column_name] = pd.Categorical(df[column_name], categories=categories)
+        return df
+
     @staticmethod
     def filter_rows(df, column_name, condition) -> pd.DataFrame | None:
         """
@@ -172,8 +556,11 @@ class PandasToolkit:
         Parameters:
         - df (pd.DataFrame): The DataFrame to filter.
         - column_name (str): The name of the column to apply the condition to.
-        - condition (callable): A function that takes a single value and returns True if the row
-                                should be included in the filtered DataFrame.
+        - condition: Decides which rows are included in the filtered DataFrame, one of
+                     - a boolean mask (pd.Series or np.ndarray) of the same length
+                     - a comparison spec such as ('>', 0), see COMPARISONS
+                     - a numpy ufunc or a `PandasToolkit.vectorized` function of the column
+                     - a function that takes a single value and returns True (slow fallback)
 
         Returns:
         - pd.DataFrame: The filtered DataFrame containing only rows where the condition is True.
@@ -186,7 +573,7 @@ class PandasToolkit:
             raise ValueError(f"Column '{column_name}' not found in the DataFrame.")
 
         # Apply the condition to the specified column
-        return df[df[column_name].apply(condition)]
+        return df[PandasToolkit.__resolve_mask(df[column_name], condition)]
 
     @staticmethod
     def modify_column(df, column_name, condition, operation):
@@ -196,21 +583,72 @@ class PandasToolkit:
         Parameters:
         - df (pd.DataFrame): The DataFrame to modify.
         - column_name (str): The name of the column to apply the condition and operation to.
-        - condition (callable): A function that takes a single value and returns True if
-                                the value should be modified.
-        - operation (callable): A function that takes a value and returns the modified value.
+        - condition: Decides which values are modified, None modifies every value, otherwise
+                     anything `filter_rows` accepts.
+        - operation: Produces the modified values, one of
+                     - an arithmetic spec such as ('*', -1), see OPERATIONS
+                     - a numpy ufunc (e.g. np.negative) or a `PandasToolkit.vectorized`
+                       function of the column
+                     - a function that takes a value and returns the modified value (slow fallback)
 
         Returns:
         - pd.DataFrame: The DataFrame with the modified column.
 
         Raises:
-        - ValueError: If the specified column does not exist in the DataFrame.
+        - ValueError: If the specified column does not exist in the DataFrame,
+                      or the operation spec is unknown.
         """
         if column_name not in df.columns:
             LOG.error(f"Column '{column_name}' not found in the DataFrame.")
             raise ValueError(f"Column '{column_name}' not found in the DataFrame.")
 
+        column = df[column_name]
+        if isinstance(operation, tuple):
+            symbol, operand = operation
+            if symbol not in PandasToolkit.OPERATIONS:
+                LOG.error(f"Unknown operation {symbol = }")
+                raise ValueError(
+                    f"Unknown operation '{symbol}', expected one of "
+                    f"{list(PandasToolkit.OPERATIONS)}"
+                )
+            values = PandasToolkit.OPERATIONS[symbol](column, operand)
+        elif PandasToolkit.__is_vectorized(operation):
+            values = operation(column)
+        else:
+            values = column.apply(operation)
+
         # Apply the condition and modify the column values using the operation
-        df.loc[df[column_name].apply(condition), column_name] = df[column_name].apply(operation)
+        if condition is None:
+            df[column_name] = values
+        else:
+            df.loc[PandasToolkit.__resolve_mask(column, condition), column_name] = values
 
         return df
+
+    @staticmethod
+    def __resolve_mask(column: pd.Series, condition) -> pd.Series | np.ndarray:
+        """
+        returns the boolean mask of a condition over the column,
+        see `filter_rows` for the accepted conditions
+
+        Raises:
+        - ValueError: If a comparison spec uses an unknown operator.
+        """
+        if isinstance(condition, (pd.Series, np.ndarray)):
+            return condition
+
+        if isinstance(condition, tuple):
+            symbol, operand = condition
+            if symbol not in PandasToolkit.COMPARISONS:
+                LOG.error(f"Unknown comparison {symbol = }")
+                raise ValueError(
+                    f"Unknown comparison '{symbol}', expected one of "
+                    f"{list(PandasToolkit.COMPARISONS)}"
+                )
+            return PandasToolkit.COMPARISONS[symbol](column, operand)
+
+        if PandasToolkit.__is_vectorized(condition):
+            return condition(column)
+
+        # Slow fallback: a Python call per value
+        return column.apply(condition)
@@ -3,8 +3,9 @@
 
 
 # Internal Modules
-from source.framework.library.a_integrator import LOG
+from source.framework.library.a_integrator import LOG, CONFIG
 from source.controller.report import Report
+from source.controller.stream_processor import StreamProcessor
 from source.model.statements import Statements
 from source.controller.processor import Processor
 
@@ -17,9 +18,15 @@ def main()-> None:
     """Starting point of program"""
     LOG.info(message="started")
 
-    activity = Statements()
+    if CONFIG.get(section="statement_settings", option="streaming",
+                  fallback="False").lower() == "true":
+        main_streaming()
+        LOG.info(message="Ended")
+        return
+
+    activity = Statements(compact=True)
     r_transactions = activity.transactions
-    t_processor = Processor(raw_transactions=r_transactions)
+    t_processor = Processor(raw_transactions=r_transactions, compact=True)
     transactions = t_processor.processed_transactions
     #transactions.to_csv("transactions.csv")
     transactions['year_month'] = transactions['transaction_date'].dt.to_period('M')
@@ -28,24 +35,35 @@ def main()-> None:
     month_groups = transactions.groupby(transactions['year_month'])
 
     for month, group in month_groups:
+        _log_month_reports(month, group)
 
-        LOG.critical(message=month)
+    LOG.info(message="Ended")
 
-        report = Report(statement=group)
+def main_streaming() -> None:
+    """Monthly reports of histories larger than the memory, from the streamed aggregates"""
+    aggregates = StreamProcessor().monthly_aggregates()
 
-        earnings = report.earnings()
-        LOG.table(table=earnings, header=earnings.columns)
+    # Earnings and expenses are summed per account and category, not listed per row
+    for month, group in aggregates.groupby('year_month'):
+        _log_month_reports(month, group)
 
-        expenses = report.expenses()
-        LOG.table(table=expenses, header=expenses.columns)
+def _log_month_reports(month, group) -> None:
+    """Logs the earnings, expenses and expense pivots of one month"""
+    LOG.critical(message=month)
 
-        expenses_category = report.expenses_category()
-        LOG.table(table=expenses_category,header=expenses_category.columns)
+    report = Report(statement=group)
 
-        expenses_sub_category =report.expenses_sub_category()
-        LOG.table(table=expenses_sub_category, header=expenses_sub_category.columns)
+    earnings = report.earnings()
+    LOG.table(table=earnings, header=earnings.columns)
 
-    LOG.info(message="Ended")
+    expenses = report.expenses()
+    LOG.table(table=expenses, header=expenses.columns)
+
+    expenses_category = report.expenses_category()
+    LOG.table(table=expenses_category,header=expenses_category.columns)
+
+    expenses_sub_category =report.expenses_sub_category()
+    LOG.table(table=expenses_sub_category, header=expenses_sub_category.columns)
 
 if __name__ == '__main__':
     main()
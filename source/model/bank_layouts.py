@@ -0,0 +1,96 @@
+"""
+Class Name: BankLayouts.py
+Blue+print of:registry of the known bank CSV layouts, detected from the header row only
+"""
+# Dependencies
+import os
+import csv
+from functools import lru_cache
+
+# Internal Dependencies
+from source.framework.library.a_integrator import LOG
+
+# CONSTANTS
+# layout -> header of the export, unified column -> source column, formatter of the bank
+# exact_header: the formatter inverts the sign, a look-alike export with extra columns
+#               must not be negated, so only the exact header is recognised
+BANK_LAYOUTS = {
+    "citi": {
+        "header": ("Status", "Date", "Description", "Debit", "Credit"),
+        "columns_map": {"transaction_date": "Date", "description": "Description",
+                        "amount": "amount"},
+        "formatter": "citi",
+        "exact_header": True,
+    },
+    "discover": {
+        "header": ("Trans. Date", "Post Date", "Description", "Amount", "Category"),
+        "columns_map": {"transaction_date": "Trans. Date", "description": "Description",
+                        "amount": "Amount"},
+        "formatter": "discover",
+        "exact_header": True,
+    },
+    "chase_credit": {
+        "header": ("Transaction Date", "Post Date", "Description", "Category", "Type",
+                   "Amount", "Memo"),
+        "columns_map": {"transaction_date": "Transaction Date", "description": "Description",
+                        "amount": "Amount"},
+        "formatter": "default",
+    },
+    "chase_checking": {
+        "header": ("Details", "Posting Date", "Description", "Amount", "Type", "Balance",
+                   "Check or Slip #"),
+        "columns_map": {"transaction_date": "Posting Date", "description": "Description",
+                        "amount": "Amount"},
+        "formatter": "default",
+    },
+}
+
+# (path, size, mtime) -> detected layout, a file header is read once per run
+_FILE_LAYOUTS: dict = {}
+
+
+def header_signature(columns) -> tuple:
+    """returns the order and case insensitive signature of a header row"""
+    return tuple(sorted(str(column).strip().lower() for column in columns if str(column).strip()))
+
+
+@lru_cache(maxsize=None)
+def layout_of_signature(signature: tuple) -> str | None:
+    """
+    returns the layout of a header signature, None if it is unknown
+    An exact signature wins, otherwise the largest layout whose columns are all present
+    (a bank adding a column to its export is still recognised) unless it needs an exact
+    header.
+    """
+    columns = set(signature)
+    best, best_size = None, 0
+    for name, layout in BANK_LAYOUTS.items():
+        layout_signature = header_signature(layout["header"])
+        if layout_signature == signature:
+            return name
+        if layout.get("exact_header"):
+            continue
+        if set(layout_signature) <= columns and len(layout_signature) > best_size:
+            best, best_size = name, len(layout_signature)
+    return best
+
+
+def detect_layout(path: str) -> str | None:
+    """returns the layout of a statement file from its header row, None if it is unknown"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    if key not in _FILE_LAYOUTS:
+        with open(path, 'r', newline='', encoding='utf-8-sig') as file:
+            header = next(csv.reader(file), [])
+        _FILE_LAYOUTS[key] = layout_of_signature(header_signature(header))
+        LOG.debug(f"{_FILE_LAYOUTS[key] = } detected for {path = }")
+    return _FILE_LAYOUTS[key]
+
+
+def layout_columns_map(layout: str | None) -> dict:
+    """returns the unified column -> source column map of the layout"""
+    return dict(BANK_LAYOUTS[layout]["columns_map"]) if layout in BANK_LAYOUTS else {}
@@ -0,0 +1,243 @@
+"""
+Class Name: FingerprintStore.py
+Blue+print of:transaction fingerprints to drop the rows repeated across overlapping exports
+"""
+# Dependencies
+import os
+import zipfile
+import numpy as np
+import pandas as pd
+
+# Internal Dependencies
+from source.framework.library.a_integrator import LOG
+
+# CONSTANTS
+FINGERPRINT_STORE_PATH = "database/cache/fingerprints.npz"
+STORE_VERSION = 2  # bump when the file layout changes
+FALSE_POSITIVE_RATE = 0.01
+HASH_FUNCTIONS = 7  # optimal for a 1% false positive rate
+
+
+class FingerprintStore:
+    """
+    Purpose: Blueprint of the persistent set of the fingerprints already ingested
+             A Bloom filter answers "never seen" for most new rows without touching the
+             history, the exact fingerprints (8 bytes a row) are kept per account and only
+             read from the disk to confirm the rows the filter reports as probably seen.
+             The filter is rebuilt twice as large once it holds more than its capacity,
+             and rebuilt from the remaining accounts when an account is removed.
+    Attributes:
+        file_path : str
+        capacity : int "fingerprints the filter is sized for"
+        count : int "fingerprints stored"
+    Methods:
+        fingerprint : returns the fingerprint of every transaction
+        contains : checks which fingerprints of an account are stored
+        add : stores fingerprints of an account
+        has_account : checks whether fingerprints of the account are stored
+        remove : forgets the fingerprints of an account, used before it is reloaded fully
+        clear : forgets every fingerprint
+        save : writes the store back to the disk
+    """
+
+    def __init__(self, file_path: str = FINGERPRINT_STORE_PATH, capacity: int = 1000000):
+        """
+        Attributes:
+            file_path : str
+            capacity : int "initial capacity of the Bloom filter"
+        """
+        self.file_path: str = os.path.join(os.getcwd(), file_path)
+        self.capacity: int = capacity
+        self.count: int = 0
+        self.__bits: np.ndarray | None = None
+        self.__store = None  # NpzFile, reads the exact fingerprints of an account lazily
+        # account -> [fingerprint arrays] of this run, merged on use,
+        # None first while the stored fingerprints of the account are not read yet
+        self.__exact: dict = {}
+        self.__changed: bool = False
+        self.load()
+
+    @staticmethod
+    def fingerprint(transactions: pd.DataFrame, export_ids=None,
+                    occurrences: dict = None) -> np.ndarray:
+        """
+        returns a uint64 hash of (account, date, normalized description, amount in cents,
+        occurrence index) for every row, computed column-wise
+        The occurrence index numbers the identical rows of one export, two coffees bought
+        the same day stay two transactions while the copy in an overlapping export matches.
+
+        Parameters:
+        - transactions (pd.DataFrame): Formatted transactions (TABLE_HEADER columns).
+        - export_ids (array-like, optional): The export (file) each row comes from,
+                                             all rows are one export by default.
+        - occurrences (dict, optional): Rows seen in the earlier chunks of the same export,
+                                        row key -> count, updated in place for the next
+                                        chunk (streaming, without export_ids).
+        """
+        # Descriptions are normalized once per distinct value
+        codes, uniques = pd.factorize(transactions['description'], use_na_sentinel=False)
+        normalized = pd.Series(uniques, dtype=object).astype(str) \
+            .str.replace(r"\s+", " ", regex=True).str.strip().str.lower().to_numpy()
+
+        keys = pd.DataFrame({
+            'account': transactions['from_account'].astype(str).to_numpy(),
+            'date': transactions['transaction_date'].to_numpy(dtype='datetime64[ns]')
+                                                    .view('int64'),
+            'description': normalized[codes],
+            'cents': np.round(transactions['amount'].fillna(0).to_numpy() * 100)
+                       .astype('int64'),
+        })
+        exports = np.zeros(len(keys), dtype='int64') if export_ids is None \
+            else np.asarray(export_ids)
+        keys['occurrence'] = keys.groupby([exports] + [keys[column] for column in keys.columns],
+                                          sort=False).cumcount().to_numpy()
+
+        if occurrences is not None:
+            # The identical rows of the earlier chunks are numbered first
+            row_keys = pd.util.hash_pandas_object(keys.drop(columns='occurrence'),
+                                                  index=False).to_numpy()
+            seen = [occurrences.get(key, 0) for key in row_keys.tolist()]
+            keys['occurrence'] += np.asarray(seen, dtype='int64')
+            for key, count in zip(*np.unique(row_keys, return_counts=True)):
+                occurrences[int(key)] = occurrences.get(int(key), 0) + int(count)
+
+        return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+    def contains(self, fingerprints: np.ndarray, account: str) -> np.ndarray:
+        """returns the mask of the fingerprints already stored for the account"""
+        found = self.__probably_contains(fingerprints)
+        if found.any():
+            found[found] = np.isin(fingerprints[found], self.__exact_fingerprints(account))
+        return found
+
+    def add(self, fingerprints: np.ndarray, account: str) -> None:
+        """stores the fingerprints of the account"""
+        if len(fingerprints) == 0:
+            return
+
+        self.__exact.setdefault(account, [None]).append(np.asarray(fingerprints, dtype='uint64'))
+        self.__changed = True
+        self.count += len(fingerprints)
+        if self.count > self.capacity:
+            self.capacity *= 2
+            self.__rebuild_filter()
+            LOG.debug(f"fingerprint filter resized to {self.capacity = }")
+        else:
+            self.__set_bits(fingerprints)
+
+    def has_account(self, account: str) -> bool:
+        """checks whether fingerprints of the account are stored, new rows can be checked"""
+        return account in self.__accounts()
+
+    def remove(self, account: str) -> None:
+        """forgets the fingerprints of the account, its rows are ingested again from scratch"""
+        if account not in self.__accounts():
+            return
+
+        self.count -= len(self.__exact_fingerprints(account))
+        self.__exact[account] = [np.empty(0, dtype='uint64')]
+        self.__changed = True
+        self.__rebuild_filter()
+        LOG.debug(f"fingerprints of {account = } removed, {self.count = }")
+
+    def clear(self) -> None:
+        """forgets every fingerprint, used before a full reprocess"""
+        self.__bits = self.__empty_filter()
+        if self.__store is not None:
+            self.__store.close()
+            self.__store = None
+        self.__exact = {}
+        self.count = 0
+        self.__changed = True
+
+    def load(self) -> None:
+        """Load the Bloom filter, the exact fingerprints are read only when needed"""
+        store = None
+        try:
+            store = np.load(self.file_path) if os.path.exists(self.file_path) else None
+            if store is not None and 'version' in store.files \
+                    and int(store['version']) == STORE_VERSION:
+                self.capacity = int(store['capacity'])
+                self.count = int(store['count'])
+                self.__bits = store['bits']
+                self.__store = store
+                return
+            if store is not None:
+                LOG.info(f"outdated fingerprint store ignored, {self.file_path = }")
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile) as e:
+            LOG.error(f"Ignoring unreadable fingerprint store {e = }")
+
+        # The accounts of an ignored store are ingested again, see has_account
+        if store is not None:
+            store.close()
+        self.clear()
+        self.__changed = False
+
+    def save(self) -> None:
+        """Save the store to a file, only when fingerprints were added or removed"""
+        if not self.__changed:
+            return
+
+        exact = {f"exact_{account}": self.__exact_fingerprints(account)
+                 for account in self.__accounts()}
+        if self.__store is not None:
+            self.__store.close()
+            self.__store = None
+        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+        with open(self.file_path, 'wb') as file:
+            np.savez(file, version=STORE_VERSION, capacity=self.capacity, count=self.count,
+                     bits=self.__bits, **exact)
+
+        self.__changed = False
+        LOG.debug(f"fingerprint store saved at {self.file_path = }")
+
+    def __accounts(self) -> set:
+        """returns the accounts with stored fingerprints"""
+        stored = set() if self.__store is None else \
+            {key[len("exact_"):] for key in self.__store.files if key.startswith("exact_")}
+        return stored | set(self.__exact)
+
+    def __exact_fingerprints(self, account: str) -> np.ndarray:
+        """returns the stored fingerprints of the account, reading them on first use"""
+        parts = self.__exact.setdefault(account, [None])
+        if parts[0] is None:
+            key = f"exact_{account}"
+            parts[0] = self.__store[key] if self.__store is not None and key in self.__store.files \
+                else np.empty(0, dtype='uint64')
+        if len(parts) > 1:
+            parts[:] = [np.unique(np.concatenate(parts))]
+        return parts[0]
+
+    def __rebuild_filter(self) -> None:
+        """rebuilds the filter from the exact fingerprints of every account"""
+        self.__bits = self.__empty_filter()
+        for account in self.__accounts():
+            self.__set_bits(self.__exact_fingerprints(account))
+
+    def __empty_filter(self) -> np.ndarray:
+        """returns the bit array of a filter sized for the capacity"""
+        bits = -self.capacity * np.log(FALSE_POSITIVE_RATE) / np.log(2) ** 2
+        return np.zeros(int(bits) // 8 + 1, dtype='uint8')
+
+    def __positions(self, fingerprints: np.ndarray) -> np.ndarray:
+        """returns the HASH_FUNCTIONS bit positions of every fingerprint (double hashing)"""
+        first = np.asarray(fingerprints, dtype='uint64')
+        second = (first * np.uint64(0x9E3779B97F4A7C15)) ^ (first >> np.uint64(31))
+        steps = np.arange(HASH_FUNCTIONS, dtype='uint64')
+        with np.errstate(over='ignore'):
+            hashes = first[:, None] + steps[None, :] * second[:, None]
+        return hashes % np.uint64(len(self.__bits) * 8)
+
+    def __set_bits(self, fingerprints: np.ndarray) -> None:
+        """sets the bits of the fingerprints in the filter"""
+        positions = self.__positions(fingerprints).ravel()
+        np.bitwise_or.at(self.__bits, positions >> np.uint64(3),
+                         np.left_shift(1, positions & np.uint64(7)).astype('uint8'))
+
+    def __probably_contains(self, fingerprints: np.ndarray) -> np.ndarray:
+        """returns the mask of the fingerprints the filter reports as probably stored"""
+        if len(fingerprints) == 0:
+            return np.zeros(0, dtype=bool)
+        positions = self.__positions(fingerprints)
+        bits = (self.__bits[positions >> np.uint64(3)] >> (positions & np.uint64(7))) & 1
+        return bits.all(axis=1)
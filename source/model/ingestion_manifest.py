@@ -0,0 +1,104 @@
+"""
+Class Name: IngestionManifest.py
+Blue+print of:record of the statement files already ingested for each account
+"""
+# Dependencies
+import os
+import json
+import hashlib
+
+# Internal Dependencies
+from source.framework.library.a_integrator import LOG
+
+# CONSTANTS
+INGESTION_MANIFEST_PATH = "database/cache/ingestion_manifest.json"
+
+
+class IngestionManifest:
+    """
+    Purpose: Blueprint of the ingestion manifest {account: {file hash: {path, rows}}}
+             Files are identified by their content, a re-downloaded copy of an ingested
+             export is recognised even under another name or mtime.
+    Attributes:
+        file_path : str
+        data : dict
+    Methods:
+        file_hash : returns the content hash of a statement file
+        is_append_only : checks whether the account only gained new files
+        is_ingested : checks whether the file was ingested for the account
+        record : adds an ingested file
+        reset : forgets every file of the account
+        save : writes the manifest back to the disk
+    """
+
+    def __init__(self, file_path: str = INGESTION_MANIFEST_PATH):
+        """
+        Attributes:
+            file_path : str
+        """
+        self.file_path: str = os.path.join(os.getcwd(), file_path)
+        self.data: dict = self.load()
+
+    @staticmethod
+    def file_hash(path: str) -> str:
+        """returns the content hash of the file"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def load(self) -> dict:
+        """
+        Load the manifest, an empty one if the file does not exist or cannot be read,
+        the accounts are then ingested again from scratch (see is_append_only)
+        """
+        if not os.path.exists(self.file_path):
+            return {}
+
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except (OSError, ValueError) as e:
+            LOG.error(f"Ignoring unreadable ingestion manifest {e = }")
+            return {}
+
+        if not isinstance(data, dict):
+            LOG.error(f"Ignoring ingestion manifest without accounts, {self.file_path = }")
+            return {}
+        return data
+
+    def is_append_only(self, account: str, paths: list) -> bool:
+        """
+        checks whether the account only gained files since the last run
+        False when nothing was ingested yet or an ingested file was edited or removed,
+        the rows it gave cannot be told apart anymore and the account is reprocessed.
+        """
+        ingested = self.data.get(account)
+        if not ingested:
+            return False
+
+        return all(
+            entry["path"] in paths and os.path.exists(entry["path"])
+            and self.file_hash(entry["path"]) == file_hash
+            for file_hash, entry in ingested.items()
+        )
+
+    def is_ingested(self, account: str, file_hash: str) -> bool:
+        """checks whether the file was ingested for the account"""
+        return file_hash in self.data.get(account, {})
+
+    def record(self, account: str, file_hash: str, path: str, rows: int) -> None:
+        """adds an ingested file of the account"""
+        self.data.setdefault(account, {})[file_hash] = {"path": path, "rows": int(rows)}
+
+    def reset(self, account: str) -> None:
+        """forgets every file of the account, used before a full reprocess"""
+        self.data.pop(account, None)
+
+    def save(self) -> None:
+        """Save the manifest to a file"""
+        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+        with open(self.file_path, 'w', encoding='utf-8') as file:
+            json.dump(self.data, file, indent=4)
+        LOG.debug(f"ingestion manifest saved at {self.file_path = }")
@@ -3,70 +3,277 @@ Class Name: OriginalStatement.py
 Purpose: Loads the bank statement and convert into pd dataframe
 """
 # Dependencies
+import os
+import glob
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Internal Dependencies
 from source.framework.library.a_integrator import LOG, CONFIG
 from source.framework.library.pandas_toolkit import PandasToolkit
+from source.model.bank_layouts import detect_layout, layout_columns_map
+from source.model.ingestion_manifest import IngestionManifest
 
 
 # CONSTANTS
+# dtype of each unified column, the dates stay text until the formatter parses them
+COLUMN_DTYPES = {'transaction_date': 'str', 'description': 'str', 'amount': 'float64'}
+# Statements without an amount column split it into these two
+AMOUNT_PARTS = {'Debit': 'float64', 'Credit': 'float64'}
+ACCOUNT_CATEGORIES = ("credit_cards", "checking_accounts")
+LOAD_RECORDS = ("load_timings", "ingested_files", "export_rows", "layouts")
 
 class OriginalStatement:
     """
     Purpose: Loads the bank statement and convert into pd dataframe
+             An account points at a CSV file, a directory of CSV files or a glob pattern,
+             the files of an account are concatenated in name order.
+             Nothing is read until a statement is accessed, then only the accounts asked for.
+    Attributes:
+        load_timings : dict "file path -> seconds spent loading it"
+        ingested_files : dict "account -> [(file hash, path, rows)] loaded in this run"
+        export_rows : dict "account -> rows of each file loaded, in concatenation order"
+        layouts : dict "account -> bank layout detected from the header of its first file"
     Methods:
+        statement_paths : returns the statement files of every account in the settings
+        columns_map : returns the unified column -> source column map of a statement file
+        iter_statements : streams the statements chunk by chunk without loading them
+        get_statement : returns the statement of one account, loading it on first access
         __load_csv :loads the csv file and returns the data
-        __load_statements : Get all the account statements from the location
+        __load_accounts : Get the statements of the given accounts from the location concurrently
     """
 
-    def __init__(self):
+    def __init__(self, accounts: list = None, manifest: IngestionManifest = None,
+                 full_reprocess: bool = True):
         """
         Attributes: all the attributes are fetched from a settings file
-            credit_cards_statements : dict
-            checking_account_statements: dict
             dir_path : str
+            accounts : list "only these accounts are available, None makes all of them"
+            manifest : IngestionManifest "hashes the loaded files into ingested_files"
+            full_reprocess : bool "False skips the files already in the manifest"
         """
         self.dir_path = \
             CONFIG.get(section="statement_settings",option="location")
-        self.__from_credit_cards: dict = \
-            self.__load_statements(account_category = "credit_cards")
-        self.__from_checking_accounts:dict = \
-            self.__load_statements(account_category = "checking_accounts")
+        # load_timings, ingested_files, export_rows and layouts of the files loaded
+        self.__records: dict = {record: {} for record in LOAD_RECORDS}
+        self.__manifest: IngestionManifest | None = manifest
+        self.__full_reprocess: bool = full_reprocess
 
-    def __load_statements(self,account_category: str)-> dict:
-        """Get the all the credit cards from the machines"""
-        LOG.debug(f"will start loading all the {account_category} statements")
+        # account -> (account category, statement files), resolved without reading them
+        self.__accounts: dict = {}
+        for account_category in ACCOUNT_CATEGORIES:
+            for account, paths in self.statement_paths((account_category,)).items():
+                if accounts is None or account in accounts:
+                    self.__accounts[account] = (account_category, paths)
 
-        # Get all the credit cards
-        accounts :list=  CONFIG.get_options(section = account_category)
+        # account -> loaded statement (None when no file could be loaded)
+        self.__statements: dict = {}
+        self.__loaded: set = set()
 
-        statements: dict = {}
+    def get_statement(self, account: str):
+        """returns the statement of the account, loaded on first access"""
+        if account not in self.__accounts:
+            LOG.error(f"Unknown or filtered out {account = }")
+            raise ValueError(f"Account '{account}' is not in the settings or was filtered out")
 
-        # Transverse all the accounts one by one
-        for account in accounts:
+        self.__load_accounts([account])
+        return self.__statements.get(account)
 
-            # Getting the path of the statement from settings
-            path = self.dir_path + CONFIG.get(section = account_category, option=account)
+    def __category_statements(self, account_categories: tuple) -> dict:
+        """
+        returns {account: statement} of the account categories, the pending ones are loaded
+        Accounts without any file left to load are not returned.
+        """
+        accounts = [account for account, (account_category, _) in self.__accounts.items()
+                    if account_category in account_categories]
+        self.__load_accounts(accounts)
+        return {account: self.__statements[account] for account in accounts
+                if account in self.__statements}
+
+    def __load_accounts(self, accounts: list) -> None:
+        """
+        Get the statements of the accounts that are not loaded yet from the machine
+        The files are loaded at once on a thread pool, CSV parsing releases the GIL.
+        """
+        pending = [account for account in accounts if account not in self.__loaded]
+        if not pending:
+            return
+        LOG.debug(f"will start loading the {pending} statements")
+
+        # Every (account, path, file hash) to load
+        jobs: list = []
+        for account in pending:
+            _, paths = self.__accounts[account]
+            jobs.extend((account, path, file_hash)
+                        for path, file_hash in self.__files_to_load(account, paths))
+
+        concurrency = int(CONFIG.get(
+            section="statement_settings", option="load_concurrency", fallback=4
+        ))
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            loaded = list(executor.map(lambda job: self.__timed_load(*job[:2]), jobs))
+
+        # Files of the same account are merged in the order they are listed
+        frames: dict = {}
+        for (account, path, file_hash), statement in zip(jobs, loaded):
+            frames.setdefault(account, []).append(statement)
+            if statement is not None:
+                self.export_rows.setdefault(account, []).append(len(statement))
+                self.layouts.setdefault(account, detect_layout(path))
+            if file_hash is not None and statement is not None:
+                self.ingested_files.setdefault(account, []).append(
+                    (file_hash, path, len(statement))
+                )
+
+        for account, account_frames in frames.items():
+            loaded_frames = [frame for frame in account_frames if frame is not None]
+            if len(loaded_frames) > 1:
+                self.__statements[account] = PandasToolkit.concat_many(loaded_frames)
+            else:
+                self.__statements[account] = loaded_frames[0] if loaded_frames else None
+        self.__loaded.update(pending)
 
-            new_statement = {
-                account: PandasToolkit.load_csv(file_path=path)
-            }
-            # loading the statement and adding it into a dict
-            statements.update(new_statement)
+        LOG.info(f"Loaded the {pending} statements "
+                 f"in {sum(self.load_timings.values()):.3f}s of loading time")
 
-            LOG.debug(f"{account} statement "\
-                                + "Loaded" if new_statement is not  None else "NOT loaded")
+    def __files_to_load(self, account: str, paths: list) -> list:
+        """returns [(path, file hash)], the files already in the manifest are skipped"""
+        if self.__manifest is None:
+            return [(path, None) for path in paths]
 
-        LOG.info(f"Loaded all the {account_category} statements")
+        files = []
+        for path in paths:
+            if not os.path.exists(path):
+                files.append((path, None))  # reported as NOT loaded
+                continue
 
-        return statements
+            file_hash = IngestionManifest.file_hash(path)
+            if not self.__full_reprocess and self.__manifest.is_ingested(account, file_hash):
+                LOG.debug(f"{account} skips the already ingested {path = }")
+                continue
+            files.append((path, file_hash))
+        return files
+
+    @staticmethod
+    def statement_paths(account_categories: tuple = ACCOUNT_CATEGORIES) -> dict:
+        """returns {account: [statement file paths]} in settings order, nothing is loaded"""
+        dir_path = CONFIG.get(section="statement_settings", option="location")
+
+        paths: dict = {}
+        for account_category in account_categories:
+            for account in CONFIG.get_options(section = account_category) or []:
+                paths[account] = OriginalStatement.resolve_files(
+                    dir_path + CONFIG.get(section = account_category, option=account)
+                )
+        return paths
+
+    @staticmethod
+    def resolve_files(path: str) -> list:
+        """returns the statement files behind a settings value: a file, a directory or a glob"""
+        if os.path.isdir(path):
+            return sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.lower().endswith(".csv")
+            )
+        if any(char in path for char in "*?["):
+            return sorted(glob.glob(path))
+        return [path]
+
+    def __timed_load(self, account: str, path: str):
+        """loads one statement file and records how long it took"""
+        start = time.perf_counter()
+        statement = self.__load_csv(account=account, path=path)
+        self.load_timings[path] = time.perf_counter() - start
+
+        LOG.debug(f"{account} statement "
+                  + ("Loaded" if statement is not None else "NOT loaded")
+                  + f" in {self.load_timings[path]:.3f}s from {path = }")
+        return statement
+
+    @staticmethod
+    def __load_csv(account: str, path: str):
+        """loads only the columns mapped in the [<account>_map] section, with explicit dtypes"""
+        dtypes = OriginalStatement.__source_dtypes(account, path)
+
+        return PandasToolkit.load_csv_columns(
+            file_path=path,
+            columns=list(dtypes),
+            dtypes=dtypes,
+            engine=CONFIG.get(section="statement_settings", option="csv_engine", fallback="auto")
+        )
+
+    @staticmethod
+    def columns_map(account: str, path: str) -> dict:
+        """
+        returns {unified column: source column} of a statement file
+        The [<account>_map] section wins, without one the layout is detected from the header.
+        """
+        if CONFIG.has_section(account + "_map"):
+            return CONFIG.get_options_pair(section=account + "_map")
+        return layout_columns_map(detect_layout(path))
+
+    @staticmethod
+    def __source_dtypes(account: str, path: str) -> dict:
+        """returns {source column: dtype} of the columns mapped for the statement file"""
+        columns_map = OriginalStatement.columns_map(account, path)
+
+        dtypes = dict(AMOUNT_PARTS)
+        for column, source_column in columns_map.items():
+            if column in COLUMN_DTYPES:
+                dtypes[source_column] = COLUMN_DTYPES[column]
+        return dtypes
+
+    @staticmethod
+    def iter_statements(chunk_size: int, accounts: list = None):
+        """
+        Streams the statements instead of loading them, for histories larger than the memory
+        yields (account, path, layout, chunk) file by file in settings order, chunk_size rows
+        at a time
+        """
+        for account, paths in OriginalStatement.statement_paths().items():
+            if accounts is not None and account not in accounts:
+                continue
+
+            for path in paths:
+                LOG.debug(f"{account} statement streamed from {path = }")
+                dtypes = OriginalStatement.__source_dtypes(account, path)
+                layout = detect_layout(path)
+                for chunk in PandasToolkit.iter_csv_columns(
+                        file_path=path, columns=list(dtypes), dtypes=dtypes,
+                        chunk_size=chunk_size):
+                    yield account, path, layout, chunk
+
+    @property
+    def load_timings(self) -> dict:
+        """returns {file path: seconds spent loading it}"""
+        return self.__records["load_timings"]
+
+    @property
+    def ingested_files(self) -> dict:
+        """returns {account: [(file hash, path, rows)]} of the files loaded in this run"""
+        return self.__records["ingested_files"]
+
+    @property
+    def export_rows(self) -> dict:
+        """returns {account: [rows of each file loaded]} in concatenation order"""
+        return self.__records["export_rows"]
+
+    @property
+    def layouts(self) -> dict:
+        """returns {account: bank layout detected from the header of its first file}"""
+        return self.__records["layouts"]
+
+    @property
+    def statements(self) -> dict:
+        """returns the statements of every account, the pending ones are loaded at once"""
+        return self.__category_statements(ACCOUNT_CATEGORIES)
 
     @property
     def from_checking_accounts(self)-> dict:
         """returns the checking account statements """
-        return self.__from_checking_accounts
+        return self.__category_statements(("checking_accounts",))
 
     @property
     def from_credit_cards(self) -> dict:
         """returns the checking account statements """
-        return self.__from_credit_cards
+        return self.__category_statements(("credit_cards",))
@@ -0,0 +1,139 @@
+"""
+Class Name: StatementCache.py
+Blue+print of:on-disk cache of the formatted statement of each account
+"""
+# Dependencies
+import os
+import json
+import hashlib
+import pandas as pd
+
+# Internal Dependencies
+from source.framework.library.a_integrator import LOG, CONFIG
+from source.framework.library.pandas_toolkit import PandasToolkit
+from source.model.bank_layouts import detect_layout
+from source.model.statement_formatter import create_statement_formatter
+
+# CONSTANTS
+STATEMENT_CACHE_DIR = "database/cache/statements"
+CACHE_VERSION = 3  # bump when the formatting output changes
+
+
+class StatementCache:
+    """
+    Purpose: Blueprint of the formatted statements cache
+             An entry is reused only while the source files (path, size, mtime) and the
+             format settings (CACHE_VERSION, [<account>_map] section, detected layout,
+             formatter spec, [date_formats] setting and deduplication) are unchanged.
+    Attributes:
+        dir_path : str
+    Methods:
+        format_settings : returns the settings the formatted statement depends on
+        fingerprint : returns the key of an account's statement
+        load : returns the cached formatted statement
+        load_previous : returns the cached formatted statement of outdated files
+        store : caches a formatted statement
+    """
+
+    def __init__(self, dir_path: str = STATEMENT_CACHE_DIR):
+        """
+        Attributes:
+            dir_path : str
+        """
+        self.dir_path: str = os.path.join(os.getcwd(), dir_path)
+
+    @staticmethod
+    def format_settings(account: str, paths: list, deduplicate: bool) -> dict:
+        """
+        returns the settings the formatted statement depends on besides its files,
+        as plain JSON values so they compare equal once written to the disk
+        """
+        layout = next((detect_layout(path) for path in paths if os.path.exists(path)), None)
+        statement_formatter = create_statement_formatter(account_name=account, layout=layout)
+        settings = {
+            "version": CACHE_VERSION,
+            "columns_map": CONFIG.get_options_pair(section=account + "_map")
+                           if CONFIG.has_section(account + "_map") else None,
+            "layout": layout,
+            "formatter": type(statement_formatter).__name__,
+            "spec": statement_formatter.spec(),
+            "deduplicate": deduplicate,
+        }
+        return json.loads(json.dumps(settings, sort_keys=True))
+
+    @staticmethod
+    def fingerprint(account: str, paths: list, settings: dict) -> str | None:
+        """returns the key of the account's statement, None if a source file is missing"""
+        digest = hashlib.sha256(f"{account}".encode())
+
+        for path in paths:
+            if not os.path.exists(path):
+                return None
+            stat = os.stat(path)
+            digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+
+        digest.update(json.dumps(settings, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def __meta_path(self, account: str) -> str:
+        """returns the path of the entry's metadata"""
+        return os.path.join(self.dir_path, f"{account}.json")
+
+    def load(self, account: str, fingerprint: str | None) -> pd.DataFrame | None:
+        """returns the cached formatted statement, None when missing or outdated"""
+        meta = self.__read_meta(account) if fingerprint is not None else None
+        if meta is None:
+            return None
+
+        if meta.get("fingerprint") != fingerprint:
+            LOG.debug(f"{account} statement changed since it was cached")
+            return None
+
+        statement = PandasToolkit.load_frame(meta["frame"])
+        if statement is not None:
+            LOG.debug(f"{account} statement loaded from the cache")
+        return statement
+
+    def load_previous(self, account: str, settings: dict) -> pd.DataFrame | None:
+        """
+        returns the last cached formatted statement even if its files changed since,
+        None when it was formatted with other settings (its rows would be stale)
+        """
+        meta = self.__read_meta(account)
+        if meta is None:
+            return None
+
+        if meta.get("settings") != settings:
+            LOG.info(f"{account} format settings changed since it was cached")
+            return None
+        return PandasToolkit.load_frame(meta["frame"])
+
+    def __read_meta(self, account: str) -> dict | None:
+        """returns the entry's metadata, None when it is missing or unreadable"""
+        meta_path = self.__meta_path(account)
+        if not os.path.exists(meta_path):
+            return None
+
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as file:
+                meta = json.load(file)
+        except (OSError, json.JSONDecodeError) as e:
+            LOG.error(f"Ignoring unreadable statement cache entry of {account = } {e = }")
+            return None
+
+        return meta if isinstance(meta, dict) and "frame" in meta else None
+
+    def store(self, account: str, fingerprint: str | None, statement: pd.DataFrame,
+              settings: dict) -> None:
+        """caches the formatted statement of the account with the settings that formatted it"""
+        if fingerprint is None:
+            return
+
+        os.makedirs(self.dir_path, exist_ok=True)
+        frame_path = PandasToolkit.save_frame(statement, os.path.join(self.dir_path, account))
+
+        with open(self.__meta_path(account), 'w', encoding='utf-8') as file:
+            json.dump({"fingerprint": fingerprint, "settings": settings, "frame": frame_path},
+                      file)
+
+        LOG.debug(f"{account} statement cached at {frame_path = }")
@@ -3,23 +3,84 @@ Class Name: StatementFormatter.py
 Blue+print of:formatting and organizing the data into desired structure
 """
 # Dependencies
+from functools import lru_cache
 import pandas as pd
-from abc import ABC, abstractmethod
 
 # Internal Dependencies
 from source.framework.library.a_integrator import LOG, TABLE_HEADER
 from source.framework.library.config_manager import CONFIG
 from source.framework.library.pandas_toolkit import PandasToolkit
+from source.model.bank_layouts import BANK_LAYOUTS, layout_columns_map
 
-class BaseStatementFormatter(ABC):
+
+@lru_cache(maxsize=None)
+def compile_transform(account_name: str, columns_map: tuple, spec: tuple):
+    """
+    Compiles a formatter spec into a single transform of the original statement
+    1. Unifies the amount column by combining debit and credit
+    2. Unifies the column names across statements
+    3. Adds from account column
+    4. Keeps only the required columns
+    5. Bank-specific sign inversion
+    6. Changes the date column to date time format
+    The TABLE_HEADER frame is built at once from the source columns, nothing is copied
+    in between. A transform is compiled once per account, column map and spec.
+
+    Args:
+        account_name: the from_account value
+        columns_map: ((unified column, source column), ...)
+        spec: ((spec key, value), ...) see BaseStatementFormatter.SPEC
+    """
+    sources = dict(columns_map)
+    options = dict(spec)
+    debit, credit = options["amount_parts"]
+
+    def transform(statement: pd.DataFrame) -> pd.DataFrame:
+        # Statements without an amount column split it into debit and credit
+        merge_amount = sources.get("amount") not in statement.columns
+        required = [sources.get(column) for column in TABLE_HEADER if column != "from_account"]
+        if merge_amount:
+            required = [column for column in required if column != sources.get("amount")] \
+                       + [debit, credit]
+        missing_columns = [column for column in required if column not in statement.columns]
+        if missing_columns:
+            LOG.error(f"\n {missing_columns = } ")
+            raise ValueError(f"Columns not found in DataFrame: {missing_columns}")
+
+        if merge_amount:
+            amount = statement[debit].combine_first(statement[credit])
+        else:
+            amount = statement[sources["amount"]]
+
+        # Without a date format it is guessed from the first date of each statement
+        return pd.DataFrame({
+            'transaction_date': PandasToolkit.parse_dates(statement[sources["transaction_date"]],
+                                                          options["date_format"]),
+            'description': statement[sources["description"]],
+            'amount': -amount if options["invert_sign"] else amount,
+            'from_account': account_name,
+        })
+
+    return transform
+
+
+class BaseStatementFormatter:
     """
     Purpose: Base class for formatting and organizing statement data into desired structure
+             A bank is described by its SPEC, the column map comes from the
+             [<account>_map] section or the detected layout.
     Attributes:
         statement : pd.DataFrame
         account_name: str
+        layout: str | None "bank layout detected from the header of the statement"
+        SPEC : dict "invert_sign, amount_parts (debit, credit) and date_format of the bank",
+               the [date_formats] setting of the account overrides the date_format
     Methods:
-        _rename_columns : will rename columns in the data table
+        get_desired_format : formats the statement with the compiled spec
+        spec : returns the spec completed by the account settings
+        columns_map : returns the unified column -> source column map
     """
+    SPEC: dict = {"invert_sign": False, "amount_parts": ("Debit", "Credit"), "date_format": None}
 
     def __init__(self, **kwargs):
         """
@@ -28,88 +89,47 @@ class BaseStatementFormatter(ABC):
         """
         self.statement: pd.DataFrame = kwargs.get("statement")
         self.account_name: str = kwargs.get("account_name")
+        self.layout: str | None = kwargs.get("layout")
 
     def get_desired_format(self)-> pd.DataFrame:
         """
-        1. Unifies the amount column be combining debit and credit
-        2. Unifies the column name across statement
-        3. Adds from account columns
-        4. Keeps only the required columns
-        5. Bank-specific formatting (implemented by child classes)
-        6. Changing the date column to date time format
+        Formats the statement in one pass with the compiled spec, see compile_transform
 
         :return: Formatted DataFrame
         """
+        transform = compile_transform(
+            self.account_name,
+            tuple(sorted(self.columns_map().items())),
+            tuple(sorted(self.spec().items()))
+        )
+        self.statement = transform(self.statement)
 
-        # Unifies the amount column be combining debit and credit
-        self._format_amount_column()
-
-        # Unifies the column name across the statement
-        self._rename_columns()
-
-        # Adds from account columns
-        self._add_from_account_col()
-
-        # keeps only the required columns
-        self._required_columns()
-
-        # Bank-specific formatting (implemented by child classes)
-        self._bank_specific_formatting()
-
-        # Changes the date column to date time format
-        self.statement['transaction_date'] = pd.to_datetime(self.statement['transaction_date'])
-
+        LOG.debug(f"{self.account_name} statement formatted with {type(self).__name__}")
+        LOG.table(table=self.statement, header=self.statement.columns)
         return self.statement
-    
-    @abstractmethod
-    def _bank_specific_formatting(self) -> None:
-        """
-        Bank-specific formatting logic to be implemented by child classes
-        """
-        pass
 
-    def _format_amount_column(self) -> None:
-        """ To perform: will rename columns in the data table"""
-
-        columns = self.statement.columns
-        lowercase_columns = [column.lower() for column in columns]
-
-        if 'amount' not in lowercase_columns:
-            self.statement = PandasToolkit.combine_first_column(
-                self.statement,col1="Debit",col2="Credit",new_column='amount'
-            )
-            LOG.info("Amount column added")
-        else:
-            LOG.debug("Amount already exists")
-
-    def _rename_columns(self) -> None:
-        """ To perform: will rename columns in the data table"""
+    def spec(self) -> dict:
+        """returns the SPEC of the bank completed by the base SPEC and the account settings"""
+        spec = BaseStatementFormatter.SPEC | self.SPEC
+        date_format = CONFIG.get(section="date_formats", option=self.account_name)
+        if date_format:
+            spec["date_format"] = date_format
+        return spec
 
+    def columns_map(self) -> dict:
+        """returns the unified column -> source column map of the statement"""
         section = self.account_name + "_map"
-        mapping_form_config = CONFIG.get_options_pair(section)
-
-        # Interchange keys and values
-        mapping = {value: key for key, value in mapping_form_config.items()}
-
-        self.statement = PandasToolkit.rename_columns(self.statement,columns_mapping=mapping)
-        LOG.debug("After renaming column the statements is")
-        LOG.table(table=self.statement, header=self.statement.columns)
-
-    def _required_columns(self)-> None:
-        """selecting only required columns """
-        required_columns = TABLE_HEADER
+        if CONFIG.has_section(section) or self.layout is None:
+            mapping = CONFIG.get_options_pair(section)
+        else:
+            # Accounts without a map section use the columns of the detected layout
+            mapping = layout_columns_map(self.layout)
 
-        self.statement = PandasToolkit.filter_columns(self.statement,required_columns)
-        LOG.debug("After filtered with required column the statement is")
-        LOG.table(table=self.statement,header=self.statement.columns)
-
-    def _add_from_account_col(self)-> None:
-        """adds a new column and fill the account name as a value"""
-        self.statement = PandasToolkit.add_column(
-            self.statement,column_name="from_account",value=self.account_name
-        )
-        LOG.debug("After adding from account column")
-        LOG.table(table=self.statement, header=self.statement.columns)
+        if not mapping:
+            LOG.error(f"No column map for {self.account_name = }")
+            raise ValueError(f"No [{section}] section and no detected layout for "
+                             f"'{self.account_name}'")
+        return mapping
 
     def get_account_name(self)-> str:
         """returns the account name"""
@@ -119,71 +139,46 @@ class BaseStatementFormatter(ABC):
 class CitiStatementFormatter(BaseStatementFormatter):
     """
     Purpose: Formatter for Citi bank statements
+             Converts expenditure to negative value and payout to positive value
     """
-    
-    def _bank_specific_formatting(self) -> None:
-        """
-        Citi bank specific formatting:
-        - Converts expenditure to negative value and payout to positive value
-        """
-        # Converts expenditure to negative value and payout to positive value
-        self.statement = PandasToolkit.modify_column(
-            df=self.statement,
-            column_name='amount',
-            condition=lambda x: True,
-            operation=lambda x: x * -1
-        )
-        LOG.debug("Applied Citi-specific formatting")
+    SPEC = {"invert_sign": True}
 
 
 class DiscoverStatementFormatter(BaseStatementFormatter):
     """
     Purpose: Formatter for Discover bank statements
+             Converts expenditure to negative value and payout to positive value
     """
-    
-    def _bank_specific_formatting(self) -> None:
-        """
-        Discover bank specific formatting:
-        - Converts expenditure to negative value and payout to positive value
-        """
-        # Converts expenditure to negative value and payout to positive value
-        self.statement = PandasToolkit.modify_column(
-            df=self.statement,
-            column_name='amount',
-            condition=lambda x: True,
-            operation=lambda x: x * -1
-        )
-        LOG.debug("Applied Discover-specific formatting")
+    SPEC = {"invert_sign": True}
 
 
 class DefaultStatementFormatter(BaseStatementFormatter):
     """
     Purpose: Default formatter for bank statements that don't need special formatting
     """
-    
-    def _bank_specific_formatting(self) -> None:
-        """
-        Default implementation - no special formatting needed
-        """
-        LOG.debug("No bank-specific formatting needed for this statement")
+    SPEC = {}
 
 
 # Factory function to create the appropriate formatter based on account name
 def create_statement_formatter(**kwargs):
     """
     Factory function to create the appropriate statement formatter based on account name
-    
+    An account without a [<account>_map] section is formatted by the bank of its detected
+    layout (see bank_layouts.detect_layout), a map section keeps the name-based choice.
+
     Args:
-        **kwargs: Keyword arguments including account_name and statement
-        
+        **kwargs: Keyword arguments including account_name, statement and optional layout
+
     Returns:
         An instance of the appropriate statement formatter class
     """
     account_name = kwargs.get("account_name")
-    
+    layout = kwargs.get("layout")
+    if layout in BANK_LAYOUTS and not CONFIG.has_section(f"{account_name}_map"):
+        account_name = BANK_LAYOUTS[layout]["formatter"]
+
     if account_name == 'citi':
         return CitiStatementFormatter(**kwargs)
-    elif account_name == 'discover':
+    if account_name == 'discover':
         return DiscoverStatementFormatter(**kwargs)
-    else:
-        return DefaultStatementFormatter(**kwargs)
+    return DefaultStatementFormatter(**kwargs)
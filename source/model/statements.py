@@ -3,19 +3,29 @@ Class Name: Statements.py
 Blue+print of:contains statement from all accounts
 """
 # Dependencies
+import configparser
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
 
 # Internal Dependencies
-from source.framework.library.a_integrator import LOG, TABLE_HEADER
+from source.framework.library.a_integrator import LOG, CONFIG, TABLE_SCHEMA
 from source.framework.library.pandas_toolkit import PandasToolkit
+from source.model.fingerprint_store import FingerprintStore
+from source.model.ingestion_manifest import IngestionManifest
 from source.model.original_statement import OriginalStatement
+from source.model.statement_cache import StatementCache
 from source.model.statement_formatter import create_statement_formatter
 
 class Statements:
     """
     Purpose: Blueprint of statements contains transactions from all accounts
     Attributes:
-        __original_statements : OriginalStatement
+        __original_statements : OriginalStatement | None
+        __statement_cache : StatementCache | None
+        __manifest : IngestionManifest | None
+        __fingerprint_store : FingerprintStore | None
+        __options : dict "compact, full_reprocess, deduplicate and format_workers settings"
     Methods:
         get_credit_card_transactions : give all credit card transactions
     """
@@ -23,50 +33,274 @@ class Statements:
     def __init__(self, **kwargs):
         """
         Attributes:
-            original_statements : OriginalStatement
+            original_statements : OriginalStatement "injected statements are never cached",
+                                  any loader with from_credit_cards and from_checking_accounts
+                                  dicts, export_rows and layouts are read when present
+            compact : bool "stores from_account as category dtype" (default False)
+            use_cache : bool "reuses formatted statements of unchanged files" (default settings)
+            full_reprocess : bool "parses every file again instead of only the new ones"
+                             (default settings)
+            deduplicate : bool "drops the transactions repeated across overlapping exports"
+                          (default settings)
+            format_workers : int "processes formatting the accounts, 1 formats them here"
+                             (default settings)
         """
-        self.__original_statements: OriginalStatement = kwargs.get(
-            "original_statements",OriginalStatement()
-        )
-        self.transactions:pd.DataFrame = pd.DataFrame(
-            columns=TABLE_HEADER
-        )
+        self.__original_statements: OriginalStatement | None = kwargs.get("original_statements")
+
+        use_cache = kwargs.get("use_cache", CONFIG.get(
+            section="statement_settings", option="use_cache", fallback="True"
+        ))
+        self.__statement_cache: StatementCache | None = StatementCache() \
+            if self.__original_statements is None and str(use_cache).lower() == "true" else None
+        self.__manifest: IngestionManifest | None = \
+            IngestionManifest() if self.__statement_cache is not None else None
+        self.__options: dict = {
+            "compact": kwargs.get("compact", False),
+            "full_reprocess": str(kwargs.get("full_reprocess", CONFIG.get(
+                section="statement_settings", option="full_reprocess", fallback="False"
+            ))).lower() == "true",
+            "deduplicate": str(kwargs.get("deduplicate", CONFIG.get(
+                section="statement_settings", option="deduplicate", fallback="True"
+            ))).lower() == "true",
+            "format_workers": int(kwargs.get("format_workers", CONFIG.get(
+                section="statement_settings", option="format_workers", fallback=1
+            ))),
+        }
+
+        # Fingerprints of every ingested row, new files skip the rows already known
+        self.__fingerprint_store: FingerprintStore | None = FingerprintStore() \
+            if self.__options["deduplicate"] and self.__statement_cache is not None else None
+        if self.__fingerprint_store is not None and self.__options["full_reprocess"]:
+            self.__fingerprint_store.clear()
+
+        # account -> settings the statement is formatted with, see StatementCache
+        self.__format_settings: dict = {}
+
+        self.transactions:pd.DataFrame = PandasToolkit.concat_many([], schema=TABLE_SCHEMA)
         self.collect_transactions()
 
     def collect_transactions(self) -> None:
         """
-        1. Combine all statements into a single dict
-        2. Traverse each statement one by one and format statement
-        3. Merge the return table into transactions' table
+        1. Takes the formatted statements of unchanged files from the cache
+        2. Loads only the new files of the accounts ingested before, everything otherwise
+        3. Traverse each statement one by one, format it and drop the repeated transactions
+        4. Merge all the formatted tables into transactions' table at once
 
         returns give all transactions.
         """
+        formatted_statements: dict = {}
+        fingerprints: dict = {}
+        previous: dict = {}
+
+        if self.__statement_cache is not None:
+            original_statements = self.__load_from_cache(formatted_statements, fingerprints,
+                                                         previous)
+        elif self.__original_statements is None:
+            original_statements = [OriginalStatement()]
+        else:
+            original_statements = [self.__original_statements]
+
+        # Combine the statements of every loader, each one reads its files here
+        statements: dict = {}
+        export_rows: dict = {}
+        layouts: dict = {}
+        for original_statement in original_statements:
+            statements |= original_statement.from_credit_cards \
+                | original_statement.from_checking_accounts
+            export_rows |= getattr(original_statement, "export_rows", {})
+            layouts |= getattr(original_statement, "layouts", {})
 
-        # Combine all statements (merging 2 dict)
-        statements = \
-            self.__original_statements.from_credit_cards\
-            | self.__original_statements.from_checking_accounts
+        # Missing files are reported as NOT loaded by OriginalStatement and add no rows
+        statements = {account: statement for account, statement in statements.items()
+                      if statement is not None}
+
+        # Formats every statement, in worker processes when enabled
+        if self.__options["format_workers"] > 1 and len(statements) > 1:
+            formatted = self.__format_in_parallel(statements, layouts)
+        else:
+            formatted = {account: _format_statement(account, statement, layouts.get(account))
+                         for account, statement in statements.items()}
+        LOG.info("statements are formatted to the desired format.")
 
         # Traverse each statement one by one
-        for account, statement in statements.items():
+        for account, formatted_statement in formatted.items():
+
+            # Overlapping exports repeat transactions, only the first copy is kept
+            if self.__options["deduplicate"]:
+                formatted_statement = self.__drop_duplicates(
+                    account, formatted_statement, export_rows.get(account),
+                    known=account in previous
+                )
 
-            # Creates the appropriate statement formatter based on account name
-            statement_formatter = create_statement_formatter(account_name=account, statement=statement)
+            # New files of an account are appended to what was ingested before
+            if account in previous:
+                formatted_statement = PandasToolkit.concat_many(
+                    [previous[account], formatted_statement], schema=TABLE_SCHEMA
+                )
+            formatted_statements[account] = formatted_statement
 
-            # Formatted statement from statement formatter
-            formatted_statement = statement_formatter.get_desired_format()
+        # Accounts without any statement file (e.g. an empty folder) add no rows
+        formatted_statements = {account: statement for account, statement
+                                in formatted_statements.items() if statement is not None}
 
-            LOG.info("statements are formatted to the desired format.")
+        if self.__statement_cache is not None:
+            self.__update_cache(formatted_statements, fingerprints, previous,
+                                original_statements)
+        if self.__fingerprint_store is not None:
+            self.__fingerprint_store.save()
 
-            # Adds into an existing transactions table
-            self.transactions = PandasToolkit.concat_dataframes(
-                self.transactions,
-                formatted_statement
+        # Single concatenation, the accumulated table is not copied once per account
+        self.transactions = PandasToolkit.concat_many(
+            list(formatted_statements.values()), schema=TABLE_SCHEMA
+        )
+
+        # Compact schema: one integer code per row, accounts in settings order
+        if self.__options["compact"]:
+            self.transactions = PandasToolkit.to_categorical(
+                self.transactions, column_name="from_account",
+                categories=list(formatted_statements)
             )
 
         LOG.info("transactions table created")
 
+    def __format_in_parallel(self, statements: dict, layouts: dict) -> dict:
+        """
+        formats each account in a worker process, the original statements are pickled to
+        the workers, only the formatted ones come back serialized by PandasToolkit.to_bytes
+        (Arrow buffers when pyarrow is installed)
+        """
+        accounts = list(statements)
+        settings = {section: dict(CONFIG.config.items(section))
+                    for section in CONFIG.config.sections()}
+
+        with ProcessPoolExecutor(max_workers=min(self.__options["format_workers"], len(accounts)),
+                                 initializer=_init_format_worker,
+                                 initargs=(settings,)) as executor:
+            results = executor.map(_format_to_bytes, accounts,
+                                   [statements[account] for account in accounts],
+                                   [layouts.get(account) for account in accounts])
+            return {account: PandasToolkit.from_bytes(data)
+                    for account, data in zip(accounts, results)}
+
+    def __drop_duplicates(self, account: str, statement: pd.DataFrame,
+                          export_rows: list | None, known: bool) -> pd.DataFrame:
+        """
+        drops the rows repeated in the statement, and with known the rows already ingested
+        in an earlier run, the fingerprints of the kept rows are stored for the next runs
+        """
+        export_ids = None
+        if export_rows and sum(export_rows) == len(statement):
+            export_ids = np.repeat(np.arange(len(export_rows)), export_rows)
+
+        fingerprints = FingerprintStore.fingerprint(statement, export_ids)
+        keep = ~pd.Series(fingerprints).duplicated().to_numpy()
+        if self.__fingerprint_store is not None:
+            if known:
+                keep &= ~self.__fingerprint_store.contains(fingerprints, account)
+            self.__fingerprint_store.add(fingerprints[keep], account)
+
+        if keep.all():
+            return statement
+        LOG.info(f"{len(keep) - keep.sum()} repeated transactions dropped")
+        return statement[keep].reset_index(drop=True)
+
+    def __load_from_cache(self, formatted_statements: dict, fingerprints: dict,
+                          previous: dict) -> list:
+        """
+        Fills the formatted statements found in the cache and returns the OriginalStatement
+        loaders of the other accounts, only the new files of an account already ingested
+        are parsed unless a full reprocess is requested or the format settings changed.
+        """
+        for account, paths in OriginalStatement.statement_paths().items():
+            self.__format_settings[account] = StatementCache.format_settings(
+                account, paths, self.__options["deduplicate"]
+            )
+            fingerprints[account] = StatementCache.fingerprint(
+                account, paths, self.__format_settings[account]
+            )
+            if self.__options["full_reprocess"]:
+                formatted_statements[account] = None
+                continue
+
+            formatted_statements[account] = \
+                self.__statement_cache.load(account, fingerprints[account])
+            # New rows are checked against the stored fingerprints of the account
+            if formatted_statements[account] is None \
+                    and self.__manifest.is_append_only(account, paths) \
+                    and (self.__fingerprint_store is None
+                         or self.__fingerprint_store.has_account(account)):
+                # Only rows formatted with the current settings can be appended to
+                stale = self.__statement_cache.load_previous(account,
+                                                             self.__format_settings[account])
+                if stale is not None:
+                    previous[account] = stale
+
+        missing = [account for account, statement in formatted_statements.items()
+                   if statement is None]
+        full = [account for account in missing if account not in previous]
+        if self.__fingerprint_store is not None:
+            # Rows of a fully loaded account are ingested again, not repeats of themselves
+            for account in full:
+                self.__fingerprint_store.remove(account)
+        LOG.info(f"{len(formatted_statements) - len(missing)} statements from the cache, "
+                 f"{len(previous)} to update, {len(full)} to load fully")
+
+        # Accounts without new files keep what was ingested before
+        for account in previous:
+            formatted_statements[account] = previous[account]
+
+        original_statements = []
+        if previous:
+            original_statements.append(OriginalStatement(
+                accounts=list(previous), manifest=self.__manifest, full_reprocess=False
+            ))
+        if full:
+            original_statements.append(OriginalStatement(
+                accounts=full, manifest=self.__manifest, full_reprocess=True
+            ))
+        return original_statements
+
+    def __update_cache(self, formatted_statements: dict, fingerprints: dict, previous: dict,
+                       original_statements: list) -> None:
+        """stores the loaded statements and records their files in the manifest"""
+        loaded = set(previous)
+        for original_statement in original_statements:
+            for account in original_statement.statements:
+                loaded.add(account)
+                if account not in previous:
+                    self.__manifest.reset(account)
+
+            for account, files in original_statement.ingested_files.items():
+                for file_hash, path, rows in files:
+                    self.__manifest.record(account, file_hash, path, rows)
+
+        for account in loaded & set(formatted_statements):
+            self.__statement_cache.store(account, fingerprints[account],
+                                         formatted_statements[account],
+                                         self.__format_settings[account])
+
+        self.__manifest.save()
+
     @staticmethod
     def future_method()-> None:
         """will update in future"""
         print("To handle pylint error")
+
+
+def _format_statement(account: str, statement: pd.DataFrame, layout: str | None) -> pd.DataFrame:
+    """formats the statement with the formatter of its layout or account name"""
+    statement_formatter = create_statement_formatter(account_name=account, statement=statement,
+                                                     layout=layout)
+    return statement_formatter.get_desired_format()
+
+
+def _init_format_worker(settings: dict) -> None:
+    """gives a worker process the settings of the parent, they may differ from the file"""
+    parser = configparser.ConfigParser(interpolation=None)
+    parser.read_dict(settings)
+    CONFIG.config = parser
+
+
+def _format_to_bytes(account: str, statement: pd.DataFrame, layout: str | None) -> bytes:
+    """formats one statement inside a worker process"""
+    return PandasToolkit.to_bytes(_format_statement(account, statement, layout))
@@ -0,0 +1,55 @@
+"""
+Test script for the logger
+"""
+# Dependencies
+import sys
+import logging
+import pandas as pd
+import pytest
+
+# Internal Dependencies
+from source.framework.library import logger
+from source.framework.library.a_integrator import LOG
+
+def create_test_dataframe(rows=100):
+    """Create a test dataframe with sample data"""
+    return pd.DataFrame({'description': [f"row {row}" for row in range(rows)],
+                         'amount': range(rows)})
+
+def test_table_is_lazy(monkeypatch, caplog):
+    """Test the table is neither rendered above DEBUG nor rendered in full at DEBUG"""
+    print("\nTesting LOG.table...")
+
+    def fail(*_, **__):
+        raise AssertionError("table rendered although DEBUG is disabled")
+    monkeypatch.setattr(logger, "tabulate", fail)
+    caplog.set_level(logging.INFO, logger="Analyser")
+    LOG.table(table=create_test_dataframe(), header=['description', 'amount'])
+    print("✓ Nothing rendered above DEBUG")
+
+    monkeypatch.undo()
+    caplog.set_level(logging.DEBUG, logger="Analyser")
+    LOG.table(table=create_test_dataframe(), header=['description', 'amount'], max_rows=4)
+    message = caplog.records[-1].getMessage()
+    assert "row 0" in message and "row 1 " in message and "row 99" in message
+    assert "row 50" not in message and "[100 rows, 96 not shown]" in message
+
+    LOG.table(table=create_test_dataframe(rows=3), header=['description', 'amount'])
+    assert "not shown" not in caplog.records[-1].getMessage()
+    print("✓ Head and tail rendered with the hidden row count")
+
+def test_caller_tag(caplog):
+    """Test the tag names the calling function, file and line"""
+    print("\nTesting the caller tag...")
+    caplog.set_level(logging.DEBUG, logger="Analyser")
+
+    for _ in range(2):
+        # expected line read from the frame, like the logger does
+        line = sys._getframe().f_lineno + 1  # pylint: disable=protected-access
+        LOG.info("tagged")
+        assert caplog.records[-1].tag == f"test_caller_tag -> test_logger.py :: {line}"
+    print("✓ function -> file :: line tag")
+
+if __name__ == "__main__":
+    # The tests need pytest fixtures
+    raise SystemExit(pytest.main([__file__]))
@@ -0,0 +1,171 @@
+"""
+Test script for the pandas toolkit
+"""
+# Dependencies
+import numpy as np
+import pandas as pd
+import pytest
+
+# Internal Dependencies
+from source.framework.library.pandas_toolkit import PandasToolkit
+
+def create_test_dataframe():
+    """Create a test dataframe with sample data"""
+    data = {
+        'transaction_date': pd.to_datetime(['2025-01-01', '2025-01-02', '2025-01-03']),
+        'description': ['Grocery Store', 'Gas Station', 'Payroll'],
+        'amount': [-100.0, -50.0, 75.0],
+        'from_account': ['citi', 'citi', 'chase']
+    }
+    return pd.DataFrame(data)
+
+def test_add_column_vectorized():
+    """Test add_column calls vectorized functions once with the whole column"""
+    print("\nTesting PandasToolkit.add_column with vectorized functions...")
+
+    calls = []
+    @PandasToolkit.vectorized
+    def is_credit(amount):
+        calls.append(len(amount))
+        return amount > 0
+
+    df = PandasToolkit.add_column(create_test_dataframe(), column_name='credit',
+                                  source_column='amount', func=is_credit)
+    df = PandasToolkit.add_column(df, column_name='absolute',
+                                  source_column='amount', func=np.abs)
+    df = PandasToolkit.add_column(df, column_name='label', source_column='description',
+                                  func=lambda description: description[:3])
+
+    assert calls == [3]
+    assert list(df['credit']) == [False, False, True]
+    assert list(df['absolute']) == [100.0, 50.0, 75.0]
+    assert list(df['label']) == ['Gro', 'Gas', 'Pay']
+    print("✓ Vectorized functions preferred, lambdas still applied per element")
+
+def test_concat_many():
+    """Test the single pass concatenation validates columns and applies the schema"""
+    print("\nTesting PandasToolkit.concat_many...")
+
+    schema = {'transaction_date': 'datetime64[ns]', 'description': 'object',
+              'amount': 'float64', 'from_account': 'object'}
+    first = create_test_dataframe()
+    second = create_test_dataframe()[['amount', 'description', 'from_account',
+                                      'transaction_date']]
+    second['amount'] = [1, 2, 3]
+
+    combined = PandasToolkit.concat_many([first, second], schema=schema)
+    assert list(combined.columns) == list(schema)
+    assert combined['amount'].dtype == 'float64' and len(combined) == 6
+    assert list(combined.index) == list(range(6))
+
+    empty = PandasToolkit.concat_many([], schema=schema)
+    assert empty.empty and empty['transaction_date'].dtype == 'datetime64[ns]'
+
+    with pytest.raises(ValueError):
+        PandasToolkit.concat_many([first, first.drop(columns='amount')], schema=schema)
+    print("✓ Missing column detected")
+    print("✓ Frames concatenated once with the schema")
+
+def test_filter_rows_and_modify_column():
+    """Test every condition/operation form gives the same result as the lambda fallback"""
+    print("\nTesting vectorized filter_rows and modify_column...")
+
+    df = create_test_dataframe()
+    expected = PandasToolkit.filter_rows(df, 'amount', condition=lambda x: x < 0)
+    for condition in (('<', 0), df['amount'] < 0, np.signbit):
+        pd.testing.assert_frame_equal(PandasToolkit.filter_rows(df, 'amount', condition),
+                                      expected)
+
+    expected = PandasToolkit.modify_column(create_test_dataframe(), 'amount',
+                                           condition=lambda x: x > 0,
+                                           operation=lambda x: x * -1)
+    for operation in (('*', -1), np.negative):
+        modified = PandasToolkit.modify_column(create_test_dataframe(), 'amount',
+                                               condition=('>', 0), operation=operation)
+        pd.testing.assert_frame_equal(modified, expected)
+
+    flipped = PandasToolkit.modify_column(create_test_dataframe(), 'amount',
+                                          condition=None, operation=np.negative)
+    assert list(flipped['amount']) == [100.0, 50.0, -75.0]
+    print("✓ Vectorized conditions and operations match the lambda fallback")
+
+def test_load_csv_columns(tmp_path):
+    """Test the loader keeps only the wanted columns with their dtypes"""
+    print("\nTesting PandasToolkit.load_csv_columns...")
+
+    csv_path = tmp_path / "statement.csv"
+    csv_path.write_text("Status,Date,Description,Debit,Credit\n"
+                        "Cleared,01/02/2025,00123,10,\n"
+                        "Cleared,01/03/2025,Payment,,20.5\n", encoding='utf-8')
+
+    df = PandasToolkit.load_csv_columns(
+        csv_path, columns=['Date', 'Description', 'Debit', 'Credit', 'Amount'],
+        dtypes={'Date': 'str', 'Description': 'str', 'Debit': 'float64', 'Credit': 'float64'},
+        engine="c"
+    )
+
+    assert list(df.columns) == ['Date', 'Description', 'Debit', 'Credit']
+    assert df.loc[0, 'Description'] == '00123' and df.loc[0, 'Date'] == '01/02/2025'
+    assert df['Debit'].dtype == 'float64'
+    assert PandasToolkit.load_csv_columns(tmp_path / "missing.csv", columns=['Date']) is None
+    print("✓ Only the mapped columns loaded with explicit dtypes")
+
+    # Formatted amounts the explicit dtype rejects are parsed from the text
+    csv_path.write_text("Date,Description,Debit\n01/02/2025,A,10\n01/03/2025,B,\n"
+                        "01/04/2025,C,\"$1,234.00\"\n01/05/2025,D,\"-1,030.00\"\n",
+                        encoding='utf-8')
+    dtypes = {'Description': 'str', 'Debit': 'float64'}
+    df = PandasToolkit.load_csv_columns(csv_path, columns=['Description', 'Debit'],
+                                        dtypes=dtypes, engine="c")
+    assert df['Debit'].dtype == 'float64'
+    assert df['Debit'].fillna(0).tolist() == [10.0, 0.0, 1234.0, -1030.0]
+    chunks = list(PandasToolkit.iter_csv_columns(csv_path, columns=['Description', 'Debit'],
+                                                 dtypes=dtypes, chunk_size=2))
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), df)
+    print("✓ Formatted amounts parsed, loaded and streamed")
+
+    csv_path.write_text("Description,Debit\nA,ten\n", encoding='utf-8')
+    assert PandasToolkit.load_csv_columns(csv_path, columns=['Debit'], dtypes=dtypes,
+                                          engine="c") is None
+    with pytest.raises(ValueError, match="ten"):
+        list(PandasToolkit.iter_csv_columns(csv_path, columns=['Debit'], dtypes=dtypes))
+    print("✓ Values that are not amounts rejected")
+
+def test_parse_dates():
+    """Test dates are parsed once per distinct string, with a fallback for a wrong format"""
+    print("\nTesting PandasToolkit.parse_dates...")
+
+    column = pd.Series(['01/02/2025', '01/03/2025', None, '01/02/2025'], index=[5, 6, 7, 8])
+
+    expected = pd.to_datetime(column)
+    pd.testing.assert_series_equal(PandasToolkit.parse_dates(column), expected)
+    pd.testing.assert_series_equal(PandasToolkit.parse_dates(column, '%m/%d/%Y'), expected)
+    pd.testing.assert_series_equal(PandasToolkit.parse_dates(column, '%Y-%m-%d'), expected)
+    print("✓ Format guessed or explicit, wrong format falls back to inference")
+
+def test_to_bytes():
+    """Test a DataFrame serialized by to_bytes is rebuilt unchanged"""
+    print("\nTesting PandasToolkit.to_bytes and from_bytes...")
+    df = create_test_dataframe()
+    pd.testing.assert_frame_equal(PandasToolkit.from_bytes(PandasToolkit.to_bytes(df)), df)
+    print("✓ Round trip with the available serializer")
+
+def test_to_bytes_arrow():
+    """Test the Arrow IPC round trip when pyarrow is installed"""
+    pytest.importorskip("pyarrow")
+    df = create_test_dataframe()
+    data = PandasToolkit.to_bytes(df)
+    assert data.startswith(b"arrow")
+    pd.testing.assert_frame_equal(PandasToolkit.from_bytes(data), df)
+    print("✓ Round trip through an Arrow IPC stream")
+
+if __name__ == "__main__":
+    print("Running pandas toolkit tests...")
+
+    test_add_column_vectorized()
+    test_concat_many()
+    test_filter_rows_and_modify_column()
+    test_parse_dates()
+    test_to_bytes()
+
+    print("\nAll tests completed.")
@@ -0,0 +1,279 @@
+"""
+Test script for the transaction processor and keyword matchers
+"""
+# Dependencies
+import json
+import random
+import pandas as pd
+import pytest
+
+# Internal Dependencies
+from source.controller.categorization_cache import CategorizationCache
+from source.controller.processor import (
+    Processor, MAPPER_SNAPSHOT_ATTR, SUB_CATEGORY_HASH_MAP_PATH
+)
+from source.controller.report import Report
+from source.framework.library.json_handler import JsonHandler
+from source.framework.library.keyword_matcher import (
+    changed_keywords, compile_matcher, invert_hash_map, match_in_parallel, MatcherPool
+)
+from source.framework.library.pandas_toolkit import PandasToolkit
+
+def create_test_dataframe():
+    """Create a test dataframe with sample data"""
+    data = {
+        'transaction_date': pd.to_datetime(['2025-01-01', '2025-01-02', '2025-01-03',
+                                            '2025-01-04', '2025-01-05']),
+        'description': ['SAFEWAY #123', 'SHELL OIL 5744', 'STARBUCKS STORE 42',
+                        'Western Digital  PAYROLL', 'UNKNOWN MERCHANT'],
+        'amount': [-45.10, -30.00, -6.25, 2500.00, -12.00],
+        'from_account': ['chase', 'chase', 'citi', 'chase_account', 'bilt']
+    }
+    return pd.DataFrame(data)
+
+def test_aho_corasick_matches_naive_mapper():
+    """Test the Aho-Corasick engine keeps the first-match-in-JSON-order semantics"""
+    print("\nTesting AhoCorasickMatcher against Processor.mapper...")
+
+    hash_map = JsonHandler(file_path=SUB_CATEGORY_HASH_MAP_PATH).data
+    matcher = compile_matcher(hash_map, engine="aho_corasick")
+
+    # Real keywords glued together with noise so several categories can match at once
+    keywords = [keyword for keywords in hash_map.values() for keyword in keywords]
+    rng = random.Random(7)
+    contents = [
+        " ".join(rng.choice(keywords + ["xyz", "TEAM", "shel", "ga"]) for _ in range(3))
+        for _ in range(500)
+    ]
+
+    for content in contents:
+        assert matcher.match(content) == Processor.mapper(content, hash_map), content
+    print("✓ Aho-Corasick engine matches the naive mapper")
+
+    # The vectorized regex backend must agree as well
+    regex = compile_matcher(hash_map, engine="regex")
+    assert regex.match_many(contents) == matcher.match_many(contents)
+    print("✓ Regex engine matches the naive mapper")
+
+def test_aho_corasick_overlapping_keywords():
+    """Test the automaton reports keywords that end on a failure link"""
+    hash_map = {"first": ["bcd"], "second": ["abcde"], "third": ["c"], "fourth": ["a.b*"]}
+    for engine in ("aho_corasick", "regex"):
+        matcher = compile_matcher(hash_map, engine=engine)
+
+        assert matcher.match("xabcdex") == "first"
+        assert matcher.match("ABCX") == "third"
+        assert matcher.match("xyz") == ""
+        assert matcher.match("A.B*") == "fourth"
+        assert matcher.match("ab") == ""
+    print("✓ Overlapping keywords resolved in JSON order")
+
+def test_processor_engines():
+    """Test both engines produce the same processed transactions"""
+    print("\nTesting Processor engines...")
+
+    fast = Processor(raw_transactions=create_test_dataframe(),
+                     use_cache=False).processed_transactions
+    naive = Processor(raw_transactions=create_test_dataframe(),
+                      engine="naive", use_cache=False).processed_transactions
+
+    regex = Processor(raw_transactions=create_test_dataframe(),
+                      engine="regex", use_cache=False).processed_transactions
+
+    pd.testing.assert_frame_equal(fast, naive)
+    pd.testing.assert_frame_equal(fast, regex)
+    assert list(fast['sub_category']) == ['groceries', 'gas', 'dining', 'salary', '']
+    assert list(fast['c_or_d']) == ['expenditures'] * 3 + ['earnings', 'expenditures']
+    assert isinstance(fast['c_or_d'].dtype, pd.CategoricalDtype)
+    print("✓ Processor engines agree")
+
+def test_match_in_parallel():
+    """Test the chunked process pool keeps the order of the descriptions"""
+    print("\nTesting match_in_parallel...")
+
+    hash_map = JsonHandler(file_path=SUB_CATEGORY_HASH_MAP_PATH).data
+    descriptions = list(create_test_dataframe()['description']) * 7
+
+    serial = compile_matcher(hash_map).match_many(descriptions)
+    parallel = match_in_parallel(hash_map, descriptions, workers=2, chunk_size=4)
+
+    assert parallel == serial
+
+    # A pool keeps its workers across calls, another hash map restarts them
+    with MatcherPool(2) as pool:
+        assert pool.match(hash_map, descriptions, chunk_size=4) == serial
+        assert pool.match(hash_map, descriptions[::-1], chunk_size=4) == serial[::-1]
+        assert pool.match({"cafe": ["STAR"]}, descriptions, chunk_size=4) \
+            == compile_matcher({"cafe": ["STAR"]}).match_many(descriptions)
+    print("✓ Parallel matching keeps the order")
+
+def test_exact_category_lookup():
+    """Test the exact lookup agrees with the substring scan on the real mappers"""
+    print("\nTesting exact category lookup...")
+
+    exact = Processor(raw_transactions=create_test_dataframe(),
+                      use_cache=False).processed_transactions
+    substring = Processor(raw_transactions=create_test_dataframe(), use_cache=False,
+                          category_lookup="substring").processed_transactions
+
+    pd.testing.assert_frame_equal(exact, substring)
+    assert list(exact['category']) == ['mandatory_needs', 'mandatory_needs', 'luxuries',
+                                       'income', '']
+
+    # Listed under several categories, the first one in JSON order wins
+    inverted = invert_hash_map({"flexible": ["subscriptions"], "luxuries": ["subscriptions",
+                                                                              "gas station"]})
+    assert inverted == {"subscriptions": "flexible", "gas station": "luxuries"}
+    print("✓ Exact lookup matches the substring scan")
+
+def test_categorization_profiler(tmp_path):
+    """Test the profiler counts hits per keyword, misses and stage timings"""
+    print("\nTesting CategorizationProfiler...")
+
+    df = pd.concat([create_test_dataframe()] * 3, ignore_index=True)
+    profiler = Processor(raw_transactions=df, use_cache=False, profile=True).profiler
+
+    assert (profiler.rows, profiler.misses) == (15, 3)
+    assert profiler.category_hits['groceries'] == 3
+    assert profiler.keyword_hits[('gas', 'oil')] == 3
+    assert profiler.keyword_hits[('gas', 'shell')] == 0
+    assert set(profiler.timings) == {'sub_category', 'category', 'c_or_d', 'cache'}
+
+    profiler.dump(str(tmp_path / "profile.csv"))
+    profiler.dump(str(tmp_path / "profile.json"))
+    report = pd.read_csv(tmp_path / "profile.csv")
+    assert report.loc[0, 'hits'] == 3 and report['hits'].iloc[-1] == 0
+    print("✓ Profiler report written")
+
+def test_compact_schema():
+    """Test the compact schema keeps the values and reports the same totals"""
+    print("\nTesting compact schema...")
+
+    plain = Processor(raw_transactions=create_test_dataframe(),
+                      use_cache=False).processed_transactions
+    compact = Processor(raw_transactions=create_test_dataframe(), use_cache=False,
+                        compact=True).processed_transactions
+
+    assert isinstance(compact['category'].dtype, pd.CategoricalDtype)
+    assert list(compact['sub_category'].cat.categories[:2]) == ['payments_made',
+                                                               'payment_confirmations']
+    pd.testing.assert_frame_equal(plain, compact.astype({'sub_category': object,
+                                                         'category': object}))
+
+    for transactions in (plain, compact):
+        transactions['year_month'] = transactions['transaction_date'].dt.to_period('M')
+    pd.testing.assert_frame_equal(Report(statement=plain).expenses_category(),
+                                  Report(statement=compact).expenses_category(),
+                                  check_index_type=False, check_like=True)
+    print("✓ Compact schema reports the same totals")
+
+def test_add_column_from_unique():
+    """Test distinct values are mapped once and scattered back by their codes"""
+    print("\nTesting PandasToolkit.add_column_from_unique...")
+
+    calls = []
+    def upper_many(values):
+        calls.append(len(values))
+        return [value.upper() for value in values]
+
+    df = pd.DataFrame({'description': ['a', 'b', 'a', 'a', 'c', 'b']}, index=[5, 4, 3, 2, 1, 0])
+    df = PandasToolkit.add_column_from_unique(df, column_name='upper',
+                                              source_column='description', func=upper_many)
+
+    assert calls == [3]
+    assert list(df['upper']) == ['A', 'B', 'A', 'A', 'C', 'B']
+    print("✓ Distinct values mapped once")
+
+def test_categorization_cache(tmp_path):
+    """Test the cache survives a reload and is dropped when the mapper changes"""
+    print("\nTesting CategorizationCache...")
+
+    mapper_path = tmp_path / "mapper.json"
+    cache_path = str(tmp_path / "cache.json")
+    mapper_path.write_text('{"dining": ["cafe"]}', encoding='utf-8')
+
+    cache = CategorizationCache(mapper_paths=(str(mapper_path),), file_path=cache_path)
+    assert not cache.lookup(["CAFE 1"])
+    cache.remember(["CAFE 1"], ["dining"])
+    cache.save()
+
+    cache = CategorizationCache(mapper_paths=(str(mapper_path),), file_path=cache_path)
+    assert cache.lookup(["CAFE 1", "CAFE 2"]) == {"CAFE 1": "dining"}
+    assert (cache.description_hits, cache.description_misses) == (1, 1)
+
+    # Only the descriptions containing an edited keyword are dropped
+    cache.remember(["TEA HOUSE"], ["dining"])
+    cache.save()
+    mapper_path.write_text('{"drinks": ["tea"], "dining": ["cafe"]}', encoding='utf-8')
+    cache = CategorizationCache(mapper_paths=(str(mapper_path),), file_path=cache_path)
+    assert cache.lookup(["CAFE 1", "TEA HOUSE"]) == {"CAFE 1": "dining"}
+    print("✓ Cache reloads and is invalidated by the mapper fingerprint")
+
+def test_changed_keywords():
+    """Test the mapper diff flags added, removed, moved and reordered keywords"""
+    old_map = {"a": ["x"], "b": ["y", "z"], "c": ["w"], "d": ["v"]}
+    new_map = {"b": ["y", "Z"], "a": ["x", "u"], "c": [], "d": ["v", "w"]}
+
+    assert changed_keywords(old_map, new_map) == ["u", "w", "x", "y", "z"]
+    assert not changed_keywords(old_map, old_map)
+    print("✓ Mapper diff flags the edited keywords")
+
+def test_recategorize():
+    """Test the incremental mode only touches the rows a mapper edit can affect"""
+    print("\nTesting Processor.recategorize...")
+
+    current_map = JsonHandler(file_path=SUB_CATEGORY_HASH_MAP_PATH).data
+    processed = Processor(raw_transactions=create_test_dataframe(),
+                          use_cache=False).processed_transactions
+
+    # Pretend the stored rows were categorized before SAFEWAY and STARBUCKS were added
+    previous_map = {category: [keyword for keyword in keywords
+                               if keyword not in ("SAFEWAY", "STARBUCKS")]
+                    for category, keywords in current_map.items()}
+    stale = processed.copy()
+    stale.loc[[0, 2], ['sub_category', 'category']] = ""
+    stale.loc[3, 'sub_category'] = "kept as is"
+
+    updated = Processor.recategorize(stale, previous_mapper=previous_map)
+
+    assert list(updated['sub_category']) == ['groceries', 'gas', 'dining', 'kept as is', '']
+    assert list(updated['category'][:3]) == list(processed['category'][:3])
+    print("✓ Only the affected rows are re-categorized")
+
+def test_recategorize_snapshot():
+    """Test the previous mapper defaults to the one the transactions were categorized with"""
+    print("\nTesting Processor.recategorize without a previous mapper...")
+    current_map = JsonHandler(file_path=SUB_CATEGORY_HASH_MAP_PATH).data
+    processed = Processor(raw_transactions=create_test_dataframe(), use_cache=False,
+                          compact=True).processed_transactions
+    assert json.loads(processed.attrs[MAPPER_SNAPSHOT_ATTR]) == current_map
+    assert Processor.recategorize(processed) is processed
+
+    # Categorized before SAFEWAY was added, whatever ran since
+    stale = processed.astype({'sub_category': object, 'category': object})
+    stale.loc[0, ['sub_category', 'category']] = ""
+    stale.attrs[MAPPER_SNAPSHOT_ATTR] = json.dumps(
+        {category: [keyword for keyword in keywords if keyword != "SAFEWAY"]
+         for category, keywords in current_map.items()})
+    Processor(raw_transactions=create_test_dataframe(), use_cache=False)
+    assert Processor.recategorize(stale)['sub_category'].iloc[0] == 'groceries'
+    print("✓ Previous mapper read from the attrs of the transactions")
+
+    with pytest.raises(ValueError):
+        Processor.recategorize(create_test_dataframe())
+    print("✓ Missing snapshot rejected")
+
+if __name__ == "__main__":
+    print("Running processor tests...")
+
+    test_aho_corasick_matches_naive_mapper()
+    test_aho_corasick_overlapping_keywords()
+    test_processor_engines()
+    test_match_in_parallel()
+    test_exact_category_lookup()
+    test_compact_schema()
+    test_add_column_from_unique()
+    test_changed_keywords()
+    test_recategorize()
+
+    print("\nAll tests completed.")
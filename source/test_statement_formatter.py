@@ -3,10 +3,10 @@ Test script for statement formatter classes
 """
 # Dependencies
 import pandas as pd
-import sys
 
 # Internal Dependencies
 from source.model.statement_formatter import (
+    compile_transform,
     create_statement_formatter,
     CitiStatementFormatter,
     DiscoverStatementFormatter,
@@ -95,6 +95,33 @@ def test_default_formatter():
     else:
         print("✗ Default formatting failed (some amounts are not positive)")
 
+def test_compiled_spec():
+    """Test the spec compiles once into the TABLE_HEADER frame"""
+    print("\nTesting the compiled formatter spec...")
+
+    df = create_test_dataframe()
+    df.loc[2, ['Debit', 'Credit']] = [None, -20.0]
+    formatted_df = create_statement_formatter(account_name='citi', statement=df) \
+        .get_desired_format()
+
+    assert list(formatted_df.columns) == ['transaction_date', 'description', 'amount',
+                                          'from_account']
+    assert list(formatted_df['amount']) == [-100.0, -50.0, 20.0]
+    assert formatted_df['transaction_date'].dtype == 'datetime64[ns]'
+    assert set(formatted_df['from_account']) == {'citi'}
+
+    # The next statement of the account reuses the compiled transform
+    compile_transform.cache_clear()
+    formatter = create_statement_formatter(account_name='citi', statement=create_test_dataframe())
+    formatter.get_desired_format()
+    key = ('citi', tuple(sorted(formatter.columns_map().items())),
+           tuple(sorted(formatter.spec().items())))
+    transform = compile_transform(*key)
+    create_statement_formatter(account_name='citi', statement=create_test_dataframe()) \
+        .get_desired_format()
+    assert compile_transform(*key) is transform
+    print("✓ Spec compiled once, debit/credit merged and sign inverted")
+
 def test_factory_function():
     """Test the create_statement_formatter factory function"""
     print("\nTesting create_statement_formatter factory function...")
@@ -127,8 +154,9 @@ if __name__ == "__main__":
     test_factory_function()
     
     # Test individual formatters
+    test_compiled_spec()
     test_citi_formatter()
     test_discover_formatter()
     test_default_formatter()
     
-    print("\nAll tests completed.")
\ No newline at end of file
+    print("\nAll tests completed.")
@@ -0,0 +1,415 @@
+"""
+Test script for loading, formatting and caching the account statements
+"""
+# Dependencies
+import os
+import time
+import threading
+import configparser
+import pandas as pd
+import pytest
+
+# Internal Dependencies
+from source.controller.processor import Processor
+from source.controller.report import Report
+from source.controller.stream_processor import StreamProcessor
+from source.framework.library.a_integrator import CONFIG
+from source.framework.library.pandas_toolkit import PandasToolkit
+from source.model.bank_layouts import detect_layout
+from source.model.fingerprint_store import FingerprintStore
+from source.model.original_statement import OriginalStatement
+from source.model.statement_cache import StatementCache
+from source.model.statements import Statements
+
+CITI_CSV = ("Status,Date,Description,Debit,Credit\n"
+            "Cleared,2025-01-02,SAFEWAY #1,10.5,\n"
+            "Cleared,2025-01-03,ONLINE PAYMENT,,20\n")
+
+def use_test_settings(monkeypatch, tmp_path):
+    """Points the settings at a temporary statement folder holding a citi export"""
+    (tmp_path / "citi.csv").write_text(CITI_CSV, encoding='utf-8')
+
+    parser = configparser.ConfigParser(interpolation=None)
+    parser.read_dict({
+        "statement_settings": {"location": f"{tmp_path}/", "csv_engine": "c",
+                               "load_concurrency": "2", "use_cache": "True"},
+        "credit_cards": {"citi": "citi.csv"},
+        "checking_accounts": {},
+        "citi_map": {"transaction_date": "Date", "description": "Description",
+                     "amount": "amount"},
+    })
+    monkeypatch.setattr(CONFIG, "config", parser)
+    monkeypatch.chdir(tmp_path)
+
+def test_statement_cache(monkeypatch, tmp_path):
+    """Test unchanged statements come from the cache without parsing the CSV again"""
+    print("\nTesting Statements with the statement cache...")
+    use_test_settings(monkeypatch, tmp_path)
+
+    first = Statements().transactions
+    assert list(first['amount']) == [-10.5, -20.0]
+    assert first['transaction_date'].dtype == 'datetime64[ns]'
+
+    def fail(*_, **__):
+        raise AssertionError("statement parsed although it is cached")
+    monkeypatch.setattr(OriginalStatement, "__init__", fail)
+
+    pd.testing.assert_frame_equal(Statements().transactions, first)
+    print("✓ Cached statement reused")
+
+    # A modified export is parsed again
+    monkeypatch.undo()
+    use_test_settings(monkeypatch, tmp_path)
+    (tmp_path / "citi.csv").write_text(CITI_CSV + "Cleared,2025-01-04,CAFE,3,\n",
+                                       encoding='utf-8')
+    assert len(Statements().transactions) == 3
+    print("✓ Modified statement reloaded")
+
+    # A format setting that is not part of the file changes the key too
+    paths = [f"{tmp_path}/citi.csv"]
+    def key():
+        return StatementCache.fingerprint("citi", paths,
+                                          StatementCache.format_settings("citi", paths, True))
+    first_key = key()
+    CONFIG.config["date_formats"] = {"citi": "%Y-%d-%m"}
+    assert key() != first_key
+    print("✓ Date format setting is part of the key")
+
+    assert StatementCache.fingerprint("citi", paths, StatementCache.format_settings(
+        "citi", paths, False)) != key()
+    print("✓ Deduplication is part of the key")
+
+    # A corrupt entry is a miss, not a crash
+    (tmp_path / "database" / "cache" / "statements" / "citi.json").write_text(
+        '{"fingerprint": ', encoding='utf-8')
+    assert len(Statements().transactions) == 3
+    print("✓ Unreadable cache entry ignored")
+
+    # Formatted amounts are parsed, not carried as text
+    (tmp_path / "citi.csv").write_text(CITI_CSV + 'Cleared,2025-01-05,TV,"$1,030.00",\n',
+                                       encoding='utf-8')
+    assert Statements().transactions['amount'].tolist() == [-10.5, -20.0, -1030.0]
+    print("✓ Formatted amount parsed")
+
+def test_incremental_ingestion(monkeypatch, tmp_path):
+    """Test a folder of monthly exports only parses the files added since the last run"""
+    print("\nTesting incremental ingestion of a statement folder...")
+    use_test_settings(monkeypatch, tmp_path)
+    CONFIG.config["credit_cards"]["citi"] = "citi/"
+
+    (tmp_path / "citi").mkdir()
+    (tmp_path / "citi" / "2025-01.csv").write_text(CITI_CSV, encoding='utf-8')
+    (tmp_path / "citi" / "2025-02.csv").write_text(
+        CITI_CSV.replace("2025-01", "2025-02"), encoding='utf-8'
+    )
+    assert len(Statements().transactions) == 4
+
+    (tmp_path / "citi" / "2025-03.csv").write_text(
+        CITI_CSV.replace("2025-01", "2025-03"), encoding='utf-8'
+    )
+    parsed = []
+    load_csv_columns = PandasToolkit.load_csv_columns
+    def tracked_load(file_path, *args, **kwargs):
+        parsed.append(os.path.basename(file_path))
+        return load_csv_columns(file_path, *args, **kwargs)
+    monkeypatch.setattr(PandasToolkit, "load_csv_columns", tracked_load)
+
+    transactions = Statements().transactions
+    assert parsed == ["2025-03.csv"]
+    assert len(transactions) == 6
+    assert list(transactions['transaction_date'].dt.month) == [1, 1, 2, 2, 3, 3]
+    print("✓ Only the new export parsed")
+
+    parsed.clear()
+    assert len(Statements(full_reprocess=True).transactions) == 6
+    assert parsed == ["2025-01.csv", "2025-02.csv", "2025-03.csv"]
+    print("✓ Full reprocess parses every export again")
+
+def test_corrupt_ingestion_state(monkeypatch, tmp_path):
+    """Test an unreadable manifest or fingerprint store reloads the accounts fully"""
+    print("\nTesting incremental ingestion with corrupt state files...")
+    use_test_settings(monkeypatch, tmp_path)
+    CONFIG.config["credit_cards"]["citi"] = "citi/"
+    (tmp_path / "citi").mkdir()
+    (tmp_path / "citi" / "2025-01.csv").write_text(CITI_CSV, encoding='utf-8')
+    assert len(Statements().transactions) == 2
+
+    parsed = []
+    load_csv_columns = PandasToolkit.load_csv_columns
+    def tracked_load(file_path, *args, **kwargs):
+        parsed.append(os.path.basename(file_path))
+        return load_csv_columns(file_path, *args, **kwargs)
+    monkeypatch.setattr(PandasToolkit, "load_csv_columns", tracked_load)
+
+    cache_dir = tmp_path / "database" / "cache"
+    for month, state_file in (("02", "ingestion_manifest.json"), ("03", "fingerprints.npz")):
+        (tmp_path / "citi" / f"2025-{month}.csv").write_text(
+            CITI_CSV.replace("2025-01", f"2025-{month}"), encoding='utf-8')
+        (cache_dir / state_file).write_bytes(b"{corrupt")
+        parsed.clear()
+        assert len(Statements().transactions) == 2 * int(month)
+        assert parsed[0] == "2025-01.csv"
+        print(f"✓ Unreadable {state_file} reloads the account")
+
+def test_format_settings_change(monkeypatch, tmp_path):
+    """Test an edited map section reformats the ingested rows instead of appending to them"""
+    print("\nTesting a map section change with incremental ingestion...")
+    use_test_settings(monkeypatch, tmp_path)
+    CONFIG.config["credit_cards"]["citi"] = "citi/"
+    (tmp_path / "citi").mkdir()
+    (tmp_path / "citi" / "2025-01.csv").write_text(CITI_CSV, encoding='utf-8')
+
+    assert list(Statements().transactions['amount']) == [-10.5, -20.0]
+
+    # Debit only now, the files are untouched
+    CONFIG.config["citi_map"]["amount"] = "Debit"
+    transactions = Statements().transactions
+    assert transactions['amount'].isna().tolist() == [False, True]
+    assert transactions['amount'].iloc[0] == -10.5
+    print("✓ Map section change reformats the existing rows")
+
+    CONFIG.config["date_formats"] = {"citi": "%Y-%d-%m"}
+    assert list(Statements().transactions['transaction_date'].dt.month) == [2, 3]
+    print("✓ Date format change reformats the existing rows")
+
+def test_overlapping_exports(monkeypatch, tmp_path):
+    """Test the transactions repeated across overlapping exports are counted once"""
+    print("\nTesting deduplication of overlapping exports...")
+    use_test_settings(monkeypatch, tmp_path)
+    CONFIG.config["credit_cards"]["citi"] = "citi/"
+
+    header, first, second = CITI_CSV.strip().split("\n")
+    coffee = "Cleared,2025-01-03,COFFEE,3,"
+    (tmp_path / "citi").mkdir()
+    (tmp_path / "citi" / "a.csv").write_text(
+        "\n".join([header, first, second, coffee, coffee]) + "\n", encoding='utf-8')
+    (tmp_path / "citi" / "b.csv").write_text(
+        "\n".join([header, coffee, coffee, second.replace("ONLINE", "online  ")]) + "\n",
+        encoding='utf-8')
+
+    transactions = Statements().transactions
+    assert list(transactions['description']) == ["SAFEWAY #1", "ONLINE PAYMENT",
+                                                 "COFFEE", "COFFEE"]
+    print("✓ Repeats across exports dropped, repeats within an export kept")
+
+    (tmp_path / "citi" / "c.csv").write_text(
+        "\n".join([header, coffee, coffee, coffee]) + "\n", encoding='utf-8')
+    transactions = Statements().transactions
+    assert len(transactions) == 5 and (transactions['description'] == "COFFEE").sum() == 3
+    assert transactions['amount'].sum() == -39.5
+    print("✓ New export checked against the stored fingerprints")
+
+def test_deduplicated_cache(monkeypatch, tmp_path):
+    """Test the cached frames follow the deduplicate setting and a full reload starts over"""
+    print("\nTesting deduplication with the statement cache...")
+    use_test_settings(monkeypatch, tmp_path)
+    CONFIG.config["credit_cards"]["citi"] = "citi/"
+    header, first, second = CITI_CSV.strip().split("\n")
+    (tmp_path / "citi").mkdir()
+    (tmp_path / "citi" / "a.csv").write_text(CITI_CSV, encoding='utf-8')
+    (tmp_path / "citi" / "b.csv").write_text(CITI_CSV, encoding='utf-8')
+
+    assert len(Statements(deduplicate=False).transactions) == 4
+    assert len(Statements().transactions) == 2
+    print("✓ Cached duplicates dropped once deduplication is enabled")
+
+    # A rewritten export reloads the account, its own rows are not repeats
+    (tmp_path / "citi" / "b.csv").write_text(
+        "\n".join([header, first, second, "Cleared,2025-01-05,CAFE,3,"]) + "\n",
+        encoding='utf-8')
+    assert list(Statements().transactions['description']) == ["SAFEWAY #1", "ONLINE PAYMENT",
+                                                              "CAFE"]
+    (tmp_path / "citi" / "b.csv").unlink()
+    assert len(Statements().transactions) == 2
+    assert FingerprintStore().count == 2
+    print("✓ Full reload forgets the stored fingerprints of the account")
+
+def test_bank_layout_detection(monkeypatch, tmp_path):
+    """Test an account without a map section is formatted from its detected layout"""
+    print("\nTesting bank layout detection...")
+    use_test_settings(monkeypatch, tmp_path)
+    CONFIG.config["credit_cards"]["my_card"] = "export.csv"
+    (tmp_path / "export.csv").write_text(
+        "Trans. Date,Post Date,Description,Amount,Category\n"
+        "01/05/2025,01/06/2025,BOOKS,12.5,Merchandise\n", encoding='utf-8')
+    (tmp_path / "chase.csv").write_text(
+        "Transaction Date,Post Date,Description,Category,Type,Amount,Memo,Rewards\n",
+        encoding='utf-8')
+    (tmp_path / "generic.csv").write_text("Status,Date,Description,Debit,Credit,Balance\n",
+                                          encoding='utf-8')
+
+    assert detect_layout(str(tmp_path / "export.csv")) == "discover"
+    assert detect_layout(str(tmp_path / "citi.csv")) == "citi"
+    assert detect_layout(str(tmp_path / "chase.csv")) == "chase_credit"
+    print("✓ Layouts detected from the header, extra columns tolerated")
+
+    # A sign inverting layout needs its exact header
+    assert detect_layout(str(tmp_path / "generic.csv")) is None
+    print("✓ Look-alike of a sign inverting layout not detected")
+
+    transactions = Statements(use_cache=False).transactions
+    card = transactions[transactions['from_account'] == "my_card"]
+    assert list(card['description']) == ["BOOKS"] and list(card['amount']) == [-12.5]
+    print("✓ Detected layout routed to the Discover formatter")
+
+    # A map section keeps the formatter of the account name
+    CONFIG.config["my_card_map"] = {"transaction_date": "Trans. Date",
+                                    "description": "Description", "amount": "Amount"}
+    transactions = Statements(use_cache=False).transactions
+    assert list(transactions[transactions['from_account'] == "my_card"]['amount']) == [12.5]
+    print("✓ Map section takes precedence over the detected layout")
+
+def test_parallel_formatting(monkeypatch, tmp_path):
+    """Test formatting in worker processes gives the same transactions"""
+    print("\nTesting process-parallel formatting...")
+    use_test_settings(monkeypatch, tmp_path)
+    CONFIG.config["credit_cards"]["citi_2"] = "citi.csv"
+    CONFIG.config["citi_2_map"] = dict(CONFIG.config["citi_map"])
+
+    serial = Statements(use_cache=False).transactions
+    parallel = Statements(use_cache=False, format_workers=2).transactions
+    pd.testing.assert_frame_equal(parallel, serial)
+    assert list(parallel['from_account']) == ["citi", "citi", "citi_2", "citi_2"]
+    print("✓ Worker processes format like the main process")
+
+def test_missing_statement_file(monkeypatch, tmp_path):
+    """Test a configured file that does not exist adds no rows instead of failing"""
+    print("\nTesting a missing statement file...")
+    use_test_settings(monkeypatch, tmp_path)
+    CONFIG.config["credit_cards"]["citi_2"] = "missing.csv"
+    CONFIG.config["citi_2_map"] = dict(CONFIG.config["citi_map"])
+
+    for kwargs in ({"use_cache": False}, {"use_cache": False, "format_workers": 2}, {}):
+        transactions = Statements(**kwargs).transactions
+        assert list(transactions['from_account']) == ["citi", "citi"]
+    print("✓ Missing file skipped, serial, parallel and cached")
+
+def test_lazy_account_loading(monkeypatch, tmp_path):
+    """Test only the accounts accessed are read from the disk"""
+    print("\nTesting lazy loading of OriginalStatement...")
+    use_test_settings(monkeypatch, tmp_path)
+    CONFIG.config["checking_accounts"]["chase_account"] = "chase.csv"
+    (tmp_path / "chase.csv").write_text("Posting Date,Description,Amount\n"
+                                        "01/02/2025,PAYROLL,100\n", encoding='utf-8')
+
+    original_statement = OriginalStatement()
+    assert not original_statement.load_timings
+    print("✓ Nothing loaded on construction")
+
+    assert len(original_statement.get_statement("citi")) == 2
+    assert list(original_statement.load_timings) == [f"{tmp_path}/citi.csv"]
+    assert list(original_statement.from_checking_accounts) == ["chase_account"]
+    assert len(original_statement.load_timings) == 2
+    print("✓ Accounts loaded once, on first access")
+
+    with pytest.raises(ValueError):
+        OriginalStatement(accounts=["citi"]).get_statement("chase_account")
+    print("✓ Filtered out account rejected")
+
+def test_concurrent_loading(monkeypatch, tmp_path):
+    """Test the files of an account load concurrently but are merged in file order"""
+    print("\nTesting concurrent loading of OriginalStatement...")
+    use_test_settings(monkeypatch, tmp_path)
+    CONFIG.config["credit_cards"]["citi"] = "citi/"
+    (tmp_path / "citi").mkdir()
+    for name, day in (("a.csv", "02"), ("b.csv", "03"), ("c.csv", "04")):
+        (tmp_path / "citi" / name).write_text("Status,Date,Description,Debit,Credit\n"
+                                              f"Cleared,2025-01-{day},{name},1,\n",
+                                              encoding='utf-8')
+
+    # The first file is the slowest one, at most load_concurrency files load at once
+    load_csv_columns = PandasToolkit.load_csv_columns
+    lock = threading.Lock()
+    running = {"now": 0, "most": 0}
+    def slow_load(file_path, **kwargs):
+        with lock:
+            running["now"] += 1
+            running["most"] = max(running["most"], running["now"])
+        time.sleep(0.2 if file_path.endswith("a.csv") else 0.05)
+        with lock:
+            running["now"] -= 1
+        return load_csv_columns(file_path, **kwargs)
+    monkeypatch.setattr(PandasToolkit, "load_csv_columns", slow_load)
+
+    original_statement = OriginalStatement()
+    statement = original_statement.get_statement("citi")
+    assert list(statement['Description']) == ["a.csv", "b.csv", "c.csv"]
+    assert running["most"] == 2
+    print("✓ Two files loaded at once, merged in file order")
+
+    paths = [f"{tmp_path}/citi/{name}" for name in ("a.csv", "b.csv", "c.csv")]
+    assert sorted(original_statement.load_timings) == paths
+    assert original_statement.load_timings[paths[0]] >= 0.2
+    assert original_statement.export_rows["citi"] == [1, 1, 1]
+    print("✓ Loading time recorded per file")
+
+def test_injected_statements(monkeypatch, tmp_path):
+    """Test injected statements are formatted without reading any other file"""
+    print("\nTesting Statements with injected original statements...")
+    use_test_settings(monkeypatch, tmp_path)
+    CONFIG.config["checking_accounts"]["chase_account"] = "chase.csv"
+    (tmp_path / "chase.csv").write_text("Posting Date,Description,Amount\n"
+                                        "01/02/2025,PAYROLL,100\n", encoding='utf-8')
+
+    injected = OriginalStatement(accounts=["citi"])
+    transactions = Statements(original_statements=injected).transactions
+    assert list(transactions['from_account']) == ["citi", "citi"]
+    assert list(injected.load_timings) == [f"{tmp_path}/citi.csv"]
+    assert not (tmp_path / "database").exists()
+    print("✓ Only the injected account read, nothing cached")
+
+    class Loader:  # pylint: disable=too-few-public-methods
+        """statements of another source, without export rows nor layouts"""
+        from_credit_cards = {"citi": pd.read_csv(tmp_path / "citi.csv")}
+        from_checking_accounts = {}
+    transactions = Statements(original_statements=Loader()).transactions
+    assert list(transactions['amount']) == [-10.5, -20.0]
+    print("✓ Loader with only from_credit_cards and from_checking_accounts accepted")
+
+def test_stream_processor(monkeypatch, tmp_path):
+    """Test the streamed monthly aggregates give the same report as the in-memory pipeline"""
+    print("\nTesting StreamProcessor against Statements + Processor...")
+    source_dir = os.getcwd()
+    use_test_settings(monkeypatch, tmp_path)
+    (tmp_path / "citi.csv").write_text(
+        CITI_CSV + CITI_CSV.replace("2025-01", "2025-02").split("\n", 1)[1]
+        + "Cleared,2025-02-09,SAFEWAY #2,4,\n",
+        encoding='utf-8'
+    )
+    monkeypatch.chdir(source_dir)  # the mappers are read from the source folder
+
+    transactions = Processor(raw_transactions=Statements(use_cache=False).transactions,
+                             use_cache=False).processed_transactions
+    transactions['year_month'] = transactions['transaction_date'].dt.to_period('M')
+
+    stream = StreamProcessor(chunk_size=2)
+    aggregates = stream.monthly_aggregates()
+    assert stream.chunks == 3 and stream.rows == 5
+    assert aggregates['transactions'].sum() == 5
+
+    for report in ("expenses_category", "expenses_sub_category"):
+        pd.testing.assert_frame_equal(getattr(Report(statement=aggregates), report)(),
+                                      getattr(Report(statement=transactions), report)(),
+                                      check_like=True)
+    assert Report(statement=aggregates).earnings()['amount'].sum() \
+        == Report(statement=transactions).earnings()['amount'].sum()
+    print("✓ Streamed aggregates match the in-memory report")
+
+    # Overlapping exports are counted once, identical rows of one export are all kept
+    monkeypatch.chdir(tmp_path)
+    CONFIG.config["credit_cards"]["citi"] = "citi/"
+    (tmp_path / "citi").mkdir()
+    coffee = "Cleared,2025-01-03,COFFEE,3,\n"
+    for name in ("a.csv", "b.csv"):
+        (tmp_path / "citi" / name).write_text(CITI_CSV + coffee + coffee, encoding='utf-8')
+    total = Statements(use_cache=False).transactions['amount'].sum()
+    monkeypatch.chdir(source_dir)
+    aggregates = StreamProcessor(chunk_size=3).monthly_aggregates()
+    assert aggregates['transactions'].sum() == 4 and aggregates['amount'].sum() == total
+    assert StreamProcessor(chunk_size=3, deduplicate=False).monthly_aggregates()[
+        'transactions'].sum() == 8
+    print("✓ Repeats across exports dropped from the stream")
+
+if __name__ == "__main__":
+    # The tests need pytest fixtures
+    raise SystemExit(pytest.main([__file__]))